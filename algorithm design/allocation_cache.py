@@ -0,0 +1,96 @@
+"""
+On-disk cache of per-tutorial allocation results.
+
+Each result is a small JSON file named by a SHA-256 of everything that decides
+the allocation: the tutorial's roster rows (sorted, so row order doesn't
+matter), the allocation settings and ALGORITHM_VERSION. Bump the version
+whenever form_teams changes what it produces for the same inputs.
+
+Reading an entry touches its mtime, and evict() (called once after a batch of
+writes) deletes the least recently used files until the directory fits in
+max_bytes.
+"""
+
+import hashlib
+import json
+import os
+
+# Part of every key, so old results are never served after an algorithm change
+ALGORITHM_VERSION = 2
+
+DEFAULT_DIR = '.allocation_cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def tutorial_key(students, **settings):
+    """Hash of a tutorial's roster rows plus the settings that produced its teams"""
+    rows = sorted((str(s['id']), s['name'], s['school'], s['gender'], repr(float(s['cgpa'])))
+                  for s in students)
+    payload = json.dumps({'version': ALGORITHM_VERSION, 'rows': rows, 'settings': settings},
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as file:
+                value = json.load(file)
+        except (OSError, ValueError):
+            # Missing, or half-written by a run that was interrupted
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        # Write then rename, so a reader never sees a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as file:
+            json.dump(value, file, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
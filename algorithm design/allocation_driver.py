@@ -0,0 +1,260 @@
+"""
+Allocation driver shared by test_basic.py and test_advanced.py.
+
+The two scripts differ in how they read a roster and how form_teams splits one
+tutorial into teams. Everything around that lives here: balance scoring,
+multi-start, the process pool, the result cache, global team numbering,
+streaming and the team-size sweep. Each function takes the script's form_teams
+as its first argument; worker processes get it by reference, the same way they
+get the scripts' other top-level functions.
+"""
+
+import csv
+import itertools
+import operator
+import random
+from concurrent.futures import ProcessPoolExecutor
+from allocation_cache import tutorial_key
+
+# Output columns, in write order, of a student dict
+output_row = operator.itemgetter('tutorial', 'id', 'school', 'name', 'gender', 'cgpa', 'team')
+
+
+def balance_score(teams, team_size, tolerance=0.15):
+    """Score a tutorial's teams the way validate_csv does: 40% gender, 40% school, 20% CGPA
+
+    Gender caps come from the tutorial's own male/female share plus tolerance (0.15 is the
+    validator's ULTRA setting); validator penalties for critical issues are left out.
+    """
+    members = [s for team in teams for s in team]
+    if not members:
+        return 100.0
+    male_count = sum(1 for s in members if s['gender'].upper() in ['M', 'MALE'])
+    female_count = len(members) - male_count
+    min_minority = 1 if min(male_count, female_count) >= 1 else 0
+    male_max = max(int(team_size * min(male_count / len(members) + tolerance, 1.0) + 0.5), min_minority)
+    female_max = max(int(team_size * min(female_count / len(members) + tolerance, 1.0) + 0.5), min_minority)
+
+    gender_ok = school_ok = high_var = 0
+    for team in teams:
+        males = sum(1 for s in team if s['gender'].upper() in ['M', 'MALE'])
+        if males <= male_max and len(team) - males <= female_max:
+            gender_ok += 1
+
+        school_count = {}
+        for s in team:
+            school_count[s['school']] = school_count.get(s['school'], 0) + 1
+        if not school_count or max(school_count.values()) <= (len(team) // 2) + 1:
+            school_ok += 1
+
+        if len(team) > 1:
+            mean = sum(s['cgpa'] for s in team) / len(team)
+            std = (sum((s['cgpa'] - mean) ** 2 for s in team) / len(team)) ** 0.5
+            if std >= 0.5:
+                high_var += 1
+
+    return (gender_ok * 40 + school_ok * 40 + (len(teams) - high_var) * 20) / len(teams)
+
+
+def _allocate_tutorial(form_teams, students, team_size, refine_time, engine, seed, scored):
+    # Worker entry point: teams come back as positions into students so the
+    # parent process can map them onto its own student dicts
+    positions = {id(s): i for i, s in enumerate(students)}
+    teams = form_teams(students, team_size, refine_time, engine, seed)
+    score = balance_score(teams, team_size) if scored else None
+    return score, [[positions[id(s)] for s in team] for team in teams]
+
+def allocate_tutorials(form_teams, tutorials, team_size, workers=1, refine_time=0.0, engine='greedy', seed=None,
+                       cache=None, starts=1):
+    """Form teams for every tutorial with form_teams, optionally in a process pool, and number them globally
+
+    refine_time is the total swap-refinement budget in seconds, split evenly across tutorials.
+    engine is 'greedy' (default) or 'flow' for the min-cost-flow allocator.
+    With a seed, each tutorial gets its own seed derived from it, and a ResultCache
+    passed as cache serves tutorials whose roster and settings haven't changed. Runs
+    with refine_time > 0 are never cached: refinement stops on a wall-clock deadline,
+    so the same seed doesn't always give the same teams.
+    With starts > 1, each tutorial is allocated under that many seeds and the teams with
+    the best balance_score are kept; the seed of every kept allocation is printed.
+    """
+    use_cache = cache is not None and seed is not None and refine_time <= 0
+    if starts > 1 and seed is None:
+        # Multi-start needs known seeds so the winner can be reproduced
+        seed = random.randrange(10 ** 9)
+        print(f"Multi-start base seed: {seed}")
+    tutorial_refine = refine_time / len(tutorials) if tutorials else 0.0
+
+    def start_seed(tut, k):
+        # Seeded per tutorial, so editing one tutorial doesn't reshuffle the others;
+        # start 0 uses the same seed as a single-start run
+        if seed is None:
+            return None
+        return f"{seed}:{tut}" if k == 0 else f"{seed}:{tut}:{k}"
+
+    tutorial_teams = {}
+    chosen = {}
+    keys = {}
+    if use_cache:
+        for tut, tut_students in tutorials.items():
+            keys[tut] = tutorial_key(tut_students, team_size=team_size, refine_time=tutorial_refine,
+                                     engine=engine, seed=start_seed(tut, 0), starts=starts)
+            cached = cache.get(keys[tut])
+            if cached is not None:
+                by_id = {str(s['id']): s for s in tut_students}
+                tutorial_teams[tut] = [[by_id[i] for i in team] for team in cached['teams']]
+                chosen[tut] = (cached['seed'], cached['score'])
+    pending = [tut for tut in tutorials if tut not in tutorial_teams]
+
+    results = {}
+    if workers > 1 and len(pending) * starts > 1:
+        # Largest tutorial first so the slowest one doesn't finish last
+        order = sorted(pending, key=lambda tut: len(tutorials[tut]), reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=random.seed) as pool:
+            futures = {(tut, k): pool.submit(_allocate_tutorial, form_teams, tutorials[tut], team_size,
+                                             tutorial_refine, engine, start_seed(tut, k), starts > 1)
+                       for tut in order for k in range(starts)}
+            for tut, k in futures:
+                results[tut, k] = futures[tut, k].result()
+    else:
+        for tut in pending:
+            for k in range(starts):
+                results[tut, k] = _allocate_tutorial(form_teams, tutorials[tut], team_size, tutorial_refine,
+                                                     engine, start_seed(tut, k), starts > 1)
+
+    for tut in pending:
+        # Highest score wins, the earliest start on ties
+        best = max(range(starts), key=lambda k: (results[tut, k][0], -k)) if starts > 1 else 0
+        score, teams = results[tut, best]
+        tut_students = tutorials[tut]
+        tutorial_teams[tut] = [[tut_students[i] for i in team] for team in teams]
+        chosen[tut] = (start_seed(tut, best), score)
+
+    if keys:
+        for tut in pending:
+            cache.put(keys[tut], {'teams': [[str(s['id']) for s in team] for team in tutorial_teams[tut]],
+                                  'seed': chosen[tut][0], 'score': chosen[tut][1]})
+        cache.evict()
+        print(f"Cache: reused {len(tutorials) - len(pending)} tutorials, allocated {len(pending)}")
+
+    if starts > 1:
+        print(f"Multi-start: best of {starts} seeds per tutorial")
+        for tut in tutorials:
+            print(f"  {tut:<10} seed {chosen[tut][0]!r:<24} score {chosen[tut][1]:.1f}")
+
+    # Number teams in tutorial order, the same as the sequential loop
+    tutorial_teams = {tut: tutorial_teams[tut] for tut in tutorials}
+    team_number = 1
+    for teams in tutorial_teams.values():
+        for team in teams:
+            for student in team:
+                student['team'] = team_number
+            team_number += 1
+    return tutorial_teams
+
+
+def _sweep_size(form_teams, calculate_ratio, tutorials, buckets, team_size, refine_time, engine, seed):
+    # Worker entry point: allocate every tutorial at one team size and return only the metrics
+    stats = {'fallback': 0}
+    result = {'team_size': team_size, 'teams': 0, 'gender': 0, 'school': 0}
+    means, stds = [], []
+    tutorial_refine = refine_time / len(tutorials) if tutorials else 0.0
+    for tut, tut_students in tutorials.items():
+        tut_seed = None if seed is None else f"{seed}:{tut}"
+        ratio = calculate_ratio(tut_students, team_size)
+        for team in form_teams(tut_students, team_size, tutorial_refine, engine, tut_seed, buckets[tut], stats):
+            result['teams'] += 1
+            male = sum(1 for s in team if s['gender'].upper() in ['M', 'MALE'])
+            female = sum(1 for s in team if s['gender'].upper() in ['F', 'FEMALE'])
+            if male > ratio['male_max'] or female > ratio['female_max']:
+                result['gender'] += 1
+
+            # Same school limit as the validator
+            school_count = {}
+            for s in team:
+                school_count[s['school']] = school_count.get(s['school'], 0) + 1
+            if school_count and max(school_count.values()) > (len(team) // 2) + 1:
+                result['school'] += 1
+
+            cgpas = [s['cgpa'] for s in team]
+            mean = sum(cgpas) / len(cgpas)
+            means.append(mean)
+            stds.append((sum((c - mean) ** 2 for c in cgpas) / len(cgpas)) ** 0.5)
+
+    result['fallback'] = stats['fallback']
+    result['mean_std'] = sum(stds) / len(stds) if stds else 0.0
+    result['max_std'] = max(stds) if stds else 0.0
+    result['mean_spread'] = max(means) - min(means) if means else 0.0
+    return result
+
+def sweep_team_sizes(form_teams, calculate_ratio, tutorials, buckets, sizes=range(4, 11), workers=1,
+                     refine_time=0.0, engine='greedy', seed=None):
+    """Allocate every tutorial once per team size and print a table of balance metrics
+
+    tutorials and their partition_students() buckets are computed once by the caller
+    and shared by every size; sizes run in a process pool when workers > 1. Columns:
+    teams over the allocator's gender caps (from calculate_ratio), teams over the
+    validator's school limit, mean/max team CGPA std, spread of team mean CGPA, and
+    students placed by the most-space fallback.
+    """
+    sizes = list(sizes)
+
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=random.seed) as pool:
+            futures = [pool.submit(_sweep_size, form_teams, calculate_ratio, tutorials, buckets, size,
+                                   refine_time, engine, seed) for size in sizes]
+            results = [future.result() for future in futures]
+    else:
+        results = [_sweep_size(form_teams, calculate_ratio, tutorials, buckets, size, refine_time, engine, seed)
+                   for size in sizes]
+
+    print("\n" + "="*80)
+    print(f"{'TEAM SIZE SWEEP':^80}")
+    print("="*80)
+    print(f"{'Size':<6} {'Teams':<7} {'Gender>cap':<11} {'School>cap':<11} {'Mean Std':<9} {'Max Std':<9} {'Mean Spread':<12} {'Fallback':<8}")
+    print("-"*80)
+    for r in results:
+        print(f"{r['team_size']:<6} {r['teams']:<7} {r['gender']:<11} {r['school']:<11} "
+              f"{r['mean_std']:<9.3f} {r['max_std']:<9.3f} {r['mean_spread']:<12.3f} {r['fallback']:<8}")
+    print("="*80)
+    return results
+
+
+def count_tutorials(filename):
+    """Number of tutorial groups in a roster CSV sorted by tutorial (first column), in one light pass"""
+    with open(filename, 'r', newline='') as file:
+        rows = csv.reader(file)
+        next(rows, None)
+        return sum(1 for _ in itertools.groupby(row[0] for row in rows if any(row)))
+
+
+def stream_teams(form_teams, students, writer, team_size, tutorial_refine_time=0.0, engine='greedy', seed=None):
+    """Allocate students already sorted by tutorial, holding only one tutorial in memory.
+
+    students is an iterable of student dicts and writer a csv.writer; each tutorial's
+    teams are written as soon as they are formed. Team numbers and columns match
+    allocate_tutorials/write_csv, but tutorials are written in input order rather than
+    sorted by name. Unlike allocate_tutorials' refine_time, tutorial_refine_time is
+    each tutorial's own budget, since the number of tutorials isn't known up front
+    (callers with a total split it using count_tutorials). Tutorials are seeded the
+    same way as in allocate_tutorials. Returns (students, tutorials) written.
+    """
+    seen = set()
+    team_number = 1
+    total = 0
+    for tut, rows in itertools.groupby(students, key=lambda s: s['tutorial']):
+        if tut in seen:
+            raise ValueError(f"Roster is not sorted by tutorial: {tut} appears more than once")
+        seen.add(tut)
+
+        tut_students = list(rows)
+        position = {id(s): i for i, s in enumerate(tut_students)}
+        tut_seed = None if seed is None else f"{seed}:{tut}"
+        for team in form_teams(tut_students, team_size, tutorial_refine_time, engine, tut_seed):
+            for student in team:
+                student['team'] = team_number
+            # write_csv keeps members in roster order within a team
+            team.sort(key=lambda s: position[id(s)])
+            writer.writerows(output_row(student) for student in team)
+            team_number += 1
+        total += len(tut_students)
+    return total, len(seen)
@@ -0,0 +1,177 @@
+"""
+Allocation benchmark on synthetic rosters.
+
+Generates a seeded roster in the records.csv format, then times each stage of
+the pipeline (read, group, allocate, write, validate) separately and prints
+the results as JSON: seconds, students per second and peak memory allocated
+during the stage.
+
+Example:
+    python benchmark.py --students 100000 --tutorials 2000 --skew 1.0 --output bench.json
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from validator_engine import ValidationEngine, STRICTNESS_LEVELS
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+NON_STEM_SCHOOLS = ["CoB (NBS)", "SSS", "SoH", "NIE", "WKW SCI", "ADM", "ASE", "LKCMedicine", "HASS"]
+
+
+def school_pools(num_schools):
+    """Split num_schools names into STEM and non-STEM pools, padding with made-up names"""
+    num_schools = max(2, num_schools)
+    num_stem = min(len(STEM_SCHOOLS), num_schools // 2)
+    stem = STEM_SCHOOLS[:num_stem]
+    non_stem = NON_STEM_SCHOOLS[:num_schools - num_stem]
+    for i in range(num_schools - num_stem - len(non_stem)):
+        non_stem.append(f"School-{i + 1}")
+    return stem, non_stem
+
+
+def tutorial_sizes(students, tutorials, skew):
+    """Sizes proportional to 1/rank**skew (0 gives equal tutorials), each at least 1"""
+    tutorials = max(1, min(tutorials, students))
+    weights = [1 / (rank + 1) ** skew for rank in range(tutorials)]
+    total = sum(weights)
+    spare = students - tutorials
+    shares = [spare * w / total for w in weights]
+    sizes = [1 + int(share) for share in shares]
+    # Hand out the rounding leftovers to the largest remainders
+    leftover = students - sum(sizes)
+    by_remainder = sorted(range(tutorials), key=lambda t: shares[t] - int(shares[t]), reverse=True)
+    for t in by_remainder[:leftover]:
+        sizes[t] += 1
+    return sizes
+
+
+def generate_roster(filename, students, tutorials=None, skew=0.0, male_ratio=0.5, stem_ratio=0.6,
+                    schools=18, cgpa='normal', cgpa_mean=3.8, cgpa_std=0.4, seed=0):
+    """Write a synthetic roster sorted by tutorial group, in the records.csv format"""
+    rng = random.Random(seed)
+    if tutorials is None:
+        tutorials = max(1, students // 50)
+    stem, non_stem = school_pools(schools)
+    ids = rng.sample(range(1, students * 10 + 1), students)
+
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Tutorial Group', 'Student ID', 'School', 'Name', 'Gender', 'CGPA'])
+        row = 0
+        for t, size in enumerate(tutorial_sizes(students, tutorials, skew)):
+            for _ in range(size):
+                school = rng.choice(stem) if rng.random() < stem_ratio else rng.choice(non_stem)
+                gender = 'Male' if rng.random() < male_ratio else 'Female'
+                if cgpa == 'uniform':
+                    value = rng.uniform(0.0, 5.0)
+                else:
+                    value = min(5.0, max(0.0, rng.gauss(cgpa_mean, cgpa_std)))
+                writer.writerow([f"G-{t + 1}", ids[row], school, f"Student {ids[row]}", gender, f"{value:.2f}"])
+                row += 1
+
+
+def run_stage(stages, name, students, trace, func, *args):
+    """Time func(*args) and record it under stages[name]; returns whatever func returns"""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    # Keep the allocator's progress prints out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        value = func(*args)
+    elapsed = time.perf_counter() - start
+    stage = {
+        'seconds': round(elapsed, 6),
+        'students_per_second': round(students / elapsed, 1) if elapsed > 0 else None,
+    }
+    if trace:
+        stage['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 3)
+        tracemalloc.stop()
+    stages[name] = stage
+    return value
+
+
+def run_benchmark(args, workdir):
+    if args.impl == 'advanced':
+        import test_advanced as allocator
+    else:
+        import test_basic as allocator
+
+    roster_file = os.path.join(workdir, 'roster.csv')
+    output_file = os.path.join(workdir, 'allocation.csv')
+    stages = {}
+    n = args.students
+
+    run_stage(stages, 'generate', n, False, generate_roster, roster_file, n, args.tutorials, args.skew,
+              args.male_ratio, args.stem_ratio, args.schools, args.cgpa, args.cgpa_mean, args.cgpa_std, args.seed)
+    students = run_stage(stages, 'read', n, args.trace, allocator.read_file, roster_file)
+    tutorials = run_stage(stages, 'group', n, args.trace, allocator.group_by_tutorial, students)
+    run_stage(stages, 'allocate', n, args.trace, allocator.allocate_tutorials, tutorials, args.team_size,
+              args.workers, args.refine_time, args.engine)
+    run_stage(stages, 'write', n, args.trace, allocator.write_csv, students, output_file)
+    if not args.skip_validate:
+        validator = ValidationEngine(args.strictness)
+        result = run_stage(stages, 'validate', n, args.trace, validator.validate_file, output_file, args.team_size)
+        stages['validate']['score'] = round(result['score'], 2)
+        stages['validate']['issues'] = len(validator.all_issues)
+
+    timed = [name for name in stages if name != 'generate']
+    total = sum(stages[name]['seconds'] for name in timed)
+    return {
+        'config': vars(args),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'stages': stages,
+        'total': {'seconds': round(total, 6), 'students_per_second': round(n / total, 1) if total > 0 else None},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the team allocator on a synthetic roster")
+    parser.add_argument('--students', type=int, default=6000)
+    parser.add_argument('--tutorials', type=int, default=None, help="default: one per 50 students")
+    parser.add_argument('--skew', type=float, default=0.0, help="tutorial size skew, 0 for equal tutorials")
+    parser.add_argument('--male-ratio', type=float, default=0.5)
+    parser.add_argument('--stem-ratio', type=float, default=0.6)
+    parser.add_argument('--schools', type=int, default=18, help="number of distinct schools")
+    parser.add_argument('--cgpa', choices=['normal', 'uniform'], default='normal')
+    parser.add_argument('--cgpa-mean', type=float, default=3.8)
+    parser.add_argument('--cgpa-std', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--impl', choices=['basic', 'advanced'], default='basic')
+    parser.add_argument('--team-size', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--refine-time', type=float, default=0.0)
+    parser.add_argument('--engine', choices=['greedy', 'flow'], default='greedy')
+    parser.add_argument('--strictness', choices=STRICTNESS_LEVELS, default="ULTRA")
+    parser.add_argument('--skip-validate', action='store_true')
+    parser.add_argument('--no-trace', dest='trace', action='store_false',
+                        help="skip tracemalloc, which slows every stage down")
+    parser.add_argument('--keep', metavar='DIR', help="write the roster and allocation here instead of a temp dir")
+    parser.add_argument('--output', help="also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        results = run_benchmark(args, args.keep)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_benchmark(args, workdir)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
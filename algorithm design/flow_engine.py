@@ -0,0 +1,216 @@
+"""
+Min-cost-flow team allocation engine.
+
+Instead of placing students greedily, decide how many students of each
+gender/STEM class every team gets by solving min-cost-flow problems, then
+deal the actual students into those slots:
+
+1. Gender: source -> gender -> team -> sink. Arcs into a team are capped at
+   male_max/female_max and carry increasing unit costs so each gender is
+   spread evenly. Flow only overflows a cap (at a very high cost) when no
+   allocation within the caps exists.
+2. STEM: with each team's gender counts fixed, route the STEM students of
+   each gender into teams so every team has at most stem_max STEM and at most
+   nonstem_max non-STEM members, again overflowing only if unavoidable.
+3. Students: fill the slots from highest to lowest CGPA, each time picking the
+   team with the lowest CGPA total that still has a slot for the student's
+   class, avoiding teams that already hit the school limit.
+
+Both flow problems are solved exactly (successive shortest paths with
+Dijkstra and node potentials), so there are no cap violations whenever the
+per-stage problem has a feasible solution. Only the standard library is used.
+"""
+
+import heapq
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+
+# Cost of pushing one student past a gender/STEM cap, far above any balancing cost
+OVERFLOW_COST = 10 ** 6
+# Extra cost of STEM students beyond a team's minimum, so every team reaches
+# its minimum (and stays within nonstem_max) before any team gets extras
+SURPLUS_COST = 10 ** 3
+
+
+class FlowNetwork:
+    def __init__(self, num_nodes):
+        self.graph = [[] for _ in range(num_nodes)]
+
+    def add_edge(self, u, v, cap, cost):
+        # Edge: [to, remaining capacity, cost, index of reverse edge]
+        self.graph[u].append([v, cap, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return self.graph[u][-1]
+
+    def min_cost_flow(self, source, sink, max_flow):
+        """Push up to max_flow units along cheapest paths; returns (flow, cost). Costs must be >= 0"""
+        n = len(self.graph)
+        potential = [0] * n
+        flow = cost = 0
+
+        while flow < max_flow:
+            dist = [None] * n
+            prev = [None] * n
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for i, (v, cap, c, _) in enumerate(self.graph[u]):
+                    if cap <= 0:
+                        continue
+                    nd = d + c + potential[u] - potential[v]
+                    if dist[v] is None or nd < dist[v]:
+                        dist[v] = nd
+                        prev[v] = (u, i)
+                        heapq.heappush(heap, (nd, v))
+
+            if dist[sink] is None:
+                break
+            for v in range(n):
+                if dist[v] is not None:
+                    potential[v] += dist[v]
+
+            # Bottleneck along the path, then update residual capacities
+            push = max_flow - flow
+            v = sink
+            while v != source:
+                u, i = prev[v]
+                push = min(push, self.graph[u][i][1])
+                v = u
+            v = sink
+            while v != source:
+                u, i = prev[v]
+                edge = self.graph[u][i]
+                edge[1] -= push
+                self.graph[v][edge[3]][1] += push
+                cost += push * edge[2]
+                v = u
+            flow += push
+
+        return flow, cost
+
+
+def _add_capped_arcs(net, u, v, cap, limit):
+    """Unit arcs u -> v: the first `cap` get increasing cost (spreads flow evenly), the rest overflow"""
+    arcs = []
+    for k in range(limit):
+        cost = k if k < cap else OVERFLOW_COST + k
+        arcs.append(net.add_edge(u, v, 1, cost))
+    return arcs
+
+
+def _used(arcs):
+    return sum(1 - arc[1] for arc in arcs)
+
+
+def _gender_of(student):
+    gender = student['gender'].upper()
+    if gender in ['M', 'MALE']:
+        return 0
+    if gender in ['F', 'FEMALE']:
+        return 1
+    return 2
+
+
+def _gender_counts(totals, team_sizes, ratio):
+    """Stage 1: number of males/females/others per team"""
+    num_teams = len(team_sizes)
+    caps = [ratio['male_max'], ratio['female_max']]
+    # Nodes: source, 3 gender nodes, teams, sink
+    source, sink = 0, 4 + num_teams
+    net = FlowNetwork(num_teams + 5)
+    for g in range(3):
+        net.add_edge(source, 1 + g, totals[g], 0)
+
+    arcs = [[None] * num_teams for _ in range(3)]
+    for t, size in enumerate(team_sizes):
+        team = 4 + t
+        for g in range(2):
+            arcs[g][t] = _add_capped_arcs(net, 1 + g, team, min(caps[g], size), size)
+        # Students without a recognised gender don't count towards any cap
+        arcs[2][t] = [net.add_edge(3, team, size, 0)]
+        net.add_edge(team, sink, size, 0)
+
+    net.min_cost_flow(source, sink, sum(totals))
+    return [[_used(arcs[g][t]) for g in range(3)] for t in range(num_teams)]
+
+
+def _stem_counts(stem_totals, gender_counts, team_sizes, ratio):
+    """Stage 2: number of STEM students of each gender per team, given the gender counts"""
+    num_teams = len(team_sizes)
+    # Nodes: source, 3 gender nodes, teams, sink
+    source, sink = 0, 4 + num_teams
+    net = FlowNetwork(num_teams + 5)
+    for g in range(3):
+        net.add_edge(source, 1 + g, stem_totals[g], 0)
+
+    arcs = [[None] * num_teams for _ in range(3)]
+    for t, size in enumerate(team_sizes):
+        team = 4 + t
+        for g in range(3):
+            arcs[g][t] = net.add_edge(1 + g, team, gender_counts[t][g], 0)
+
+        # A team needs at least size - nonstem_max STEM members and at most stem_max
+        low = max(0, size - ratio['nonstem_max'])
+        high = min(size, ratio['stem_max'])
+        for k in range(size):
+            if k < low:
+                cost = k
+            elif k < high:
+                cost = SURPLUS_COST + k
+            else:
+                cost = OVERFLOW_COST + k
+            net.add_edge(team, sink, 1, cost)
+
+    net.min_cost_flow(source, sink, sum(stem_totals))
+    return [[gender_counts[t][g] - arcs[g][t][1] for g in range(3)] for t in range(num_teams)]
+
+
+def flow_form_teams(students, team_sizes, ratio, school_limit=2):
+    """Allocate one tutorial into teams of the given sizes using min-cost flow"""
+    num_teams = len(team_sizes)
+    if num_teams == 0:
+        return []
+
+    # Class of a student: (gender 0/1/2, STEM True/False). Students without a
+    # school go with non-STEM, which can only make the STEM stage stricter.
+    gender_totals = [0, 0, 0]
+    stem_totals = [0, 0, 0]
+    for s in students:
+        g = _gender_of(s)
+        gender_totals[g] += 1
+        stem_totals[g] += s['school'] in STEM_SCHOOLS
+
+    gender_counts = _gender_counts(gender_totals, team_sizes, ratio)
+    stem_counts = _stem_counts(stem_totals, gender_counts, team_sizes, ratio)
+
+    slots = {}
+    for t in range(num_teams):
+        for g in range(3):
+            slots[(g, True), t] = stem_counts[t][g]
+            slots[(g, False), t] = gender_counts[t][g] - stem_counts[t][g]
+
+    # Stage 3: highest CGPA first into the weakest team that has a slot for it
+    teams = [[] for _ in range(num_teams)]
+    cgpa_sums = [0.0] * num_teams
+    school_counts = [{} for _ in range(num_teams)]
+    order = sorted(students, key=lambda s: (-s['cgpa'], s['id']))
+    for s in order:
+        key = (_gender_of(s), s['school'] in STEM_SCHOOLS)
+        school = s['school']
+        best = None
+        for t in range(num_teams):
+            if slots[key, t] <= 0:
+                continue
+            rank = (school_counts[t].get(school, 0) >= school_limit, cgpa_sums[t])
+            if best is None or rank < best[0]:
+                best = (rank, t)
+        t = best[1]
+        slots[key, t] -= 1
+        teams[t].append(s)
+        cgpa_sums[t] += s['cgpa']
+        school_counts[t][school] = school_counts[t].get(school, 0) + 1
+
+    return teams
@@ -0,0 +1,191 @@
+"""
+Swap-based local search that tidies up teams after the greedy pass.
+
+Tries pairs of students from different teams of the same tutorial and swaps
+them if that lowers the balance penalty, until a full pass over all pairs
+finds nothing to improve. A swap that would break the allocator's own limits
+(gender and STEM caps, school_max, max_std) for a team that met them is never
+made, and neither is one that adds CGPA outliers (the validator's 2-std check)
+to the two teams. Each team keeps running counters, so a proposed swap is
+scored in O(1) without recounting either team; outliers are only counted for
+the few swaps that would be accepted.
+"""
+
+import random
+import time
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+
+# Weight of one student over a gender or school cap relative to the soft terms.
+# STEM caps only matter to the allocator (the validator doesn't check them),
+# so they weigh less than a gender imbalance.
+HARD_WEIGHT = 10.0
+STEM_WEIGHT = 1.0
+# Default team CGPA std limit: where the validator starts flagging high variance.
+# Allocators with a tighter limit of their own pass it as max_std.
+MAX_CGPA_STD = 0.5
+
+
+def _student_key(student):
+    gender = student['gender'].upper()
+    sex = 0 if gender in ['M', 'MALE'] else 1 if gender in ['F', 'FEMALE'] else 2
+    school = student['school']
+    stem = 0 if school in STEM_SCHOOLS else 1 if school else 2
+    return sex, stem, school, student['cgpa']
+
+
+class _TeamCounts:
+    def __init__(self, keys, school_max):
+        self.size = len(keys)
+        self.school_max = school_max
+        self.sex = [0, 0, 0]
+        self.stem = [0, 0, 0]
+        self.schools = {}
+        self.cgpa_sum = 0.0
+        self.cgpa_sq = 0.0
+        for sex, stem, school, cgpa in keys:
+            self.sex[sex] += 1
+            self.stem[stem] += 1
+            if school:
+                self.schools[school] = self.schools.get(school, 0) + 1
+            self.cgpa_sum += cgpa
+            self.cgpa_sq += cgpa * cgpa
+        self.school_excess = sum(max(0, c - school_max) for c in self.schools.values())
+
+    def school_excess_after(self, old_school, new_school):
+        # Only the two schools touched by a swap can change, so adjust the cached total
+        excess = self.school_excess
+        if old_school == new_school:
+            return excess
+        for school, change in ((old_school, -1), (new_school, 1)):
+            if school:
+                before = self.schools.get(school, 0)
+                excess += max(0, before + change - self.school_max) - max(0, before - self.school_max)
+        return excess
+
+    def swap(self, old, new):
+        self.school_excess = self.school_excess_after(old[2], new[2])
+        self.sex[old[0]] -= 1
+        self.sex[new[0]] += 1
+        self.stem[old[1]] -= 1
+        self.stem[new[1]] += 1
+        if old[2]:
+            self.schools[old[2]] -= 1
+        if new[2]:
+            self.schools[new[2]] = self.schools.get(new[2], 0) + 1
+        self.cgpa_sum += new[3] - old[3]
+        self.cgpa_sq += new[3] * new[3] - old[3] * old[3]
+
+
+class _Scorer:
+    def __init__(self, ratio, counts, max_std):
+        self.caps = (ratio['male_max'], ratio['female_max'], ratio['stem_max'], ratio['nonstem_max'])
+        self.max_std = max_std
+        # Tutorial-wide shares each team should mirror
+        total = sum(c.size for c in counts)
+        self.male_share = sum(c.sex[0] for c in counts) / total
+        self.stem_share = sum(c.stem[0] for c in counts) / total
+        self.mean_cgpa = sum(c.cgpa_sum for c in counts) / total
+
+    def score(self, team, old=None, new=None):
+        """(penalty, within limits) of a team, or of the same team with student old replaced by new"""
+        if team.size == 0:
+            return 0.0, True
+        sex, stem, school_excess = team.sex, team.stem, team.school_excess
+        cgpa_sum, cgpa_sq = team.cgpa_sum, team.cgpa_sq
+        if old is not None:
+            sex = [sex[k] - (old[0] == k) + (new[0] == k) for k in (0, 1)]
+            stem = [stem[k] - (old[1] == k) + (new[1] == k) for k in (0, 1)]
+            school_excess = team.school_excess_after(old[2], new[2])
+            cgpa_sum += new[3] - old[3]
+            cgpa_sq += new[3] * new[3] - old[3] * old[3]
+
+        excess = max(0, sex[0] - self.caps[0]) + max(0, sex[1] - self.caps[1]) + school_excess
+        stem_excess = max(0, stem[0] - self.caps[2]) + max(0, stem[1] - self.caps[3])
+
+        # Sample std, the same as TeamTable.feasible() in the allocator
+        mean = cgpa_sum / team.size
+        sq_diff = max(cgpa_sq - cgpa_sum * mean, 0.0)
+        std = (sq_diff / (team.size - 1)) ** 0.5 if team.size > 1 else 0.0
+        std_excess = max(0.0, std - self.max_std)
+        within = excess == 0 and stem_excess == 0 and std_excess <= 1e-12
+
+        # Soft terms: gender and STEM mix close to the tutorial's, team mean CGPA
+        # close to the tutorial mean, and no very spread-out teams
+        male_gap = sex[0] - team.size * self.male_share
+        stem_gap = stem[0] - team.size * self.stem_share
+        drift = mean - self.mean_cgpa
+        penalty = (HARD_WEIGHT * (excess + std_excess) + STEM_WEIGHT * stem_excess +
+                   2 * male_gap * male_gap + 0.5 * stem_gap * stem_gap + team.size * drift * drift)
+        return penalty, within
+
+
+def _outliers(keys):
+    # Members more than 2 std (population, as the validator computes it) from the team mean
+    n = len(keys)
+    if n < 2:
+        return 0
+    mean = sum(k[3] for k in keys) / n
+    std = (sum((k[3] - mean) ** 2 for k in keys) / n) ** 0.5
+    return sum(1 for k in keys if std > 0 and abs(k[3] - mean) > 2 * std)
+
+
+def refine_teams(teams, ratio, time_budget, school_max=2, max_std=MAX_CGPA_STD, rng=random):
+    """Swap students between teams while it lowers the balance penalty, for at most time_budget seconds
+
+    school_max and max_std (sample std of a team's CGPAs) should be the limits the
+    allocator placed students under, so refinement never undoes them.
+    Each pass tries every pair of students from different teams, in a shuffled order,
+    and the search stops early once a whole pass finds no improving swap.
+    """
+    if time_budget <= 0 or len(teams) < 2:
+        return 0
+
+    keys = [[_student_key(s) for s in team] for team in teams]
+    counts = [_TeamCounts(k, school_max) for k in keys]
+    if sum(c.size for c in counts) == 0:
+        return 0
+    scorer = _Scorer(ratio, counts, max_std)
+    penalties, within = map(list, zip(*(scorer.score(c) for c in counts)))
+
+    # Swaps keep team sizes, so every (team, slot) position stays valid throughout
+    positions = [(t, k) for t, team in enumerate(teams) for k in range(len(team))]
+    deadline = time.perf_counter() + time_budget
+    swaps = 0
+    attempts = 0
+    improved = True
+    while improved:
+        improved = False
+        rng.shuffle(positions)
+        for x, (i, a) in enumerate(positions):
+            for j, b in positions[x + 1:]:
+                if i == j:
+                    continue
+                attempts += 1
+                if attempts % 64 == 0 and time.perf_counter() >= deadline:
+                    return swaps
+
+                key_a, key_b = keys[i][a], keys[j][b]
+                if key_a == key_b:
+                    continue
+
+                new_i, ok_i = scorer.score(counts[i], key_a, key_b)
+                new_j, ok_j = scorer.score(counts[j], key_b, key_a)
+                # Teams within the limits stay within them; teams outside may only improve
+                if (within[i] and not ok_i) or (within[j] and not ok_j):
+                    continue
+                if new_i + new_j < penalties[i] + penalties[j] - 1e-12:
+                    after_i = keys[i][:a] + [key_b] + keys[i][a + 1:]
+                    after_j = keys[j][:b] + [key_a] + keys[j][b + 1:]
+                    if _outliers(after_i) + _outliers(after_j) > _outliers(keys[i]) + _outliers(keys[j]):
+                        continue
+                    counts[i].swap(key_a, key_b)
+                    counts[j].swap(key_b, key_a)
+                    teams[i][a], teams[j][b] = teams[j][b], teams[i][a]
+                    keys[i][a], keys[j][b] = key_b, key_a
+                    penalties[i], penalties[j] = new_i, new_j
+                    within[i], within[j] = ok_i, ok_j
+                    swaps += 1
+                    improved = True
+
+    return swaps
@@ -0,0 +1,303 @@
+"""
+Columnar student roster backed by NumPy arrays.
+
+Each student is a row index into a set of arrays (integer ID, float CGPA and
+small-int codes for tutorial, gender and school). StudentView gives the rest of
+the allocator the same dict-style access it had with one dict per student.
+
+Roster.load() keeps the parsed columns as .npy files in a .roster_cache
+directory next to the CSV and memory-maps them on the next load, so an
+unchanged roster is not parsed again and processes loading it share pages.
+An entry is only used while the CSV's path, size and mtime still match.
+"""
+
+import contextlib
+import csv
+import gc
+import hashlib
+import json
+import os
+from collections.abc import MutableMapping
+import numpy as np
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+
+ROSTER_CACHE_DIR = '.roster_cache'
+# Part of every cache entry; bump it whenever from_csv's columns change
+ROSTER_CACHE_VERSION = 4
+CACHED_COLUMNS = ('ids', 'cgpa', 'tutorial', 'gender', 'school', 'team', 'names')
+
+# Header spellings from_csv accepts, matched after strip() and lower(): records.csv and
+# test_advanced write 'Tutorial Group'/'Student ID', test_basic writes 'tutorial'/'id'
+HEADER_ALIASES = {'tutorial group': 'tutorial', 'tutorial': 'tutorial', 'student id': 'id', 'id': 'id',
+                  'school': 'school', 'name': 'name', 'gender': 'gender', 'cgpa': 'cgpa', 'team': 'team'}
+
+# Gender codes stored in Roster.sex
+MALE = 0
+FEMALE = 1
+OTHER = 2
+
+
+def gender_code(gender):
+    gender = gender.upper()
+    if gender in ['M', 'MALE']:
+        return MALE
+    if gender in ['F', 'FEMALE']:
+        return FEMALE
+    return OTHER
+
+
+def _team_number(value):
+    # Team is allocator output, so a blank or placeholder cell ("team_number") just means no team yet
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def code_dtype(num_labels):
+    """Smallest integer type that holds label codes 0..num_labels-1"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_labels <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+class Roster:
+    def __init__(self, ids, cgpa, tutorial, gender, school, team, names,
+                 tutorial_names, gender_names, school_names):
+        self.ids = ids
+        self.cgpa = cgpa
+        self.tutorial = tutorial
+        self.gender = gender
+        self.school = school
+        self.team = team
+        self.names = names
+        self.tutorial_names = tutorial_names
+        self.gender_names = gender_names
+        self.school_names = school_names
+
+        # Derived flags, looked up once per distinct label instead of once per student
+        gender_sex = np.array([gender_code(g) for g in gender_names], dtype=np.int8)
+        school_stem = np.array([s in STEM_SCHOOLS for s in school_names], dtype=bool)
+        school_known = np.array([bool(s) for s in school_names], dtype=bool)
+        self.sex = gender_sex[gender] if len(gender_sex) else np.zeros(0, dtype=np.int8)
+        self.stem = school_stem[school] if len(school_stem) else np.zeros(0, dtype=bool)
+        self.nonstem = (school_known[school] & ~self.stem) if len(school_known) else np.zeros(0, dtype=bool)
+
+    @classmethod
+    def from_csv(cls, filename):
+        """Parse a roster CSV (optionally with a Team column) into columns; team 0 means unallocated"""
+        ids, cgpa, tutorial, gender, school, team, names = [], [], [], [], [], [], []
+        tutorial_codes, gender_codes, school_codes = {}, {}, {}
+
+        with open(filename, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            column = {HEADER_ALIASES.get(field.strip().lower(), field): field for field in reader.fieldnames or []}
+            has_team = 'team' in column
+
+            for row in reader:
+                if not any(row.values()):
+                    continue
+                try:
+                    student_id = int(row[column['id']])
+                    student_cgpa = float(row[column['cgpa']])
+                    student_team = _team_number(row[column['team']]) if has_team else 0
+                    tut, sex, sch, name = (row[column['tutorial']], row[column['gender']],
+                                           row[column['school']], row[column['name']])
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Warning: Invalid data for row {row}: {e}")
+                    continue
+
+                ids.append(student_id)
+                cgpa.append(student_cgpa)
+                team.append(student_team)
+                names.append(name)
+                tutorial.append(tutorial_codes.setdefault(tut, len(tutorial_codes)))
+                gender.append(gender_codes.setdefault(sex, len(gender_codes)))
+                school.append(school_codes.setdefault(sch, len(school_codes)))
+
+        return cls(np.array(ids, dtype=np.int64),
+                   np.array(cgpa, dtype=np.float64),
+                   np.array(tutorial, dtype=code_dtype(len(tutorial_codes))),
+                   np.array(gender, dtype=code_dtype(len(gender_codes))),
+                   np.array(school, dtype=code_dtype(len(school_codes))),
+                   np.array(team, dtype=np.int32),
+                   names,
+                   list(tutorial_codes), list(gender_codes), list(school_codes))
+
+    @classmethod
+    def load(cls, filename, cache=True):
+        """from_csv through the memory-mapped column cache next to the file"""
+        if not cache:
+            return cls.from_csv(filename)
+        # Stat before parsing, so a file changed mid-parse never matches its entry
+        source = _source_key(filename)
+        prefix = _cache_prefix(filename)
+        roster = cls._from_cache(prefix, source)
+        if roster is None:
+            roster = cls.from_csv(filename)
+            try:
+                roster._save_cache(prefix, source)
+            except OSError:
+                # Read-only directory and the like: just run uncached
+                pass
+        return roster
+
+    @classmethod
+    def _from_cache(cls, prefix, source):
+        try:
+            with open(prefix + '.json', 'r') as file:
+                meta = json.load(file)
+            if meta['source'] != source:
+                return None
+            # Read-only maps, except team: copy-on-write, since allocation assigns it
+            # Plain ndarray views of the maps: same pages, without np.memmap's per-index overhead
+            columns = {name: np.asarray(np.load(f"{prefix}.{name}.npy", mmap_mode='c' if name == 'team' else 'r'))
+                       for name in CACHED_COLUMNS}
+        except (OSError, ValueError, KeyError):
+            return None
+        if len({len(column) for column in columns.values()}) > 1:
+            return None
+        return cls(columns['ids'], columns['cgpa'], columns['tutorial'], columns['gender'],
+                   columns['school'], columns['team'], columns['names'],
+                   meta['tutorial_names'], meta['gender_names'], meta['school_names'])
+
+    def _save_cache(self, prefix, source):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        columns = {'ids': self.ids, 'cgpa': self.cgpa, 'tutorial': self.tutorial, 'gender': self.gender,
+                   'school': self.school, 'team': self.team, 'names': np.array(self.names, dtype=str)}
+        # Write then rename, columns first and the metadata last, so a reader
+        # either finds a complete entry or a mismatch
+        for name in CACHED_COLUMNS:
+            _replace_file(f"{prefix}.{name}.npy", lambda file: np.save(file, columns[name]))
+        meta = {'source': source, 'tutorial_names': self.tutorial_names,
+                'gender_names': self.gender_names, 'school_names': self.school_names}
+        _replace_file(prefix + '.json', lambda file: file.write(json.dumps(meta).encode('utf-8')))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def view(self, row):
+        return StudentView(self, row)
+
+    def views(self):
+        with _gc_paused():
+            return [StudentView(self, row) for row in range(len(self))]
+
+    def tutorial_views(self):
+        """StudentView lists per tutorial, in the same order as tutorial_rows()"""
+        with _gc_paused():
+            return {name: [StudentView(self, row) for row in rows.tolist()]
+                    for name, rows in self.tutorial_rows().items()}
+
+    def tutorial_rows(self):
+        """Row indices of every tutorial, in order of first appearance"""
+        order = np.argsort(self.tutorial, kind='stable')
+        bounds = np.searchsorted(self.tutorial[order], np.arange(len(self.tutorial_names) + 1))
+        return {name: order[bounds[code]:bounds[code + 1]]
+                for code, name in enumerate(self.tutorial_names)}
+
+    def count_gender(self, rows):
+        sex = self.sex[rows]
+        return int(np.count_nonzero(sex == MALE)), int(np.count_nonzero(sex == FEMALE))
+
+    def count_stem(self, rows):
+        return int(np.count_nonzero(self.stem[rows])), int(np.count_nonzero(self.nonstem[rows]))
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    # Views hold no reference cycles, so skip the collection passes that a million new
+    # tracked objects would otherwise set off
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _source_key(filename):
+    """What a cache entry must match: the CSV's absolute path, size and mtime"""
+    stat = os.stat(filename)
+    return {'version': ROSTER_CACHE_VERSION, 'path': os.path.abspath(filename),
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _cache_prefix(filename):
+    # One entry per CSV path, in a cache directory beside the CSV
+    path = os.path.abspath(filename)
+    digest = hashlib.sha256(path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(os.path.dirname(path), ROSTER_CACHE_DIR, f"{os.path.basename(path)}.{digest}")
+
+
+def _replace_file(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as file:
+        write(file)
+    os.replace(tmp, path)
+
+
+class StudentView(MutableMapping):
+    """Dict-style window onto one roster row; only 'team' can be written"""
+    __slots__ = ('roster', 'row')
+
+    FIELDS = ('tutorial', 'id', 'school', 'name', 'gender', 'cgpa', 'team')
+
+    def __init__(self, roster, row):
+        self.roster = roster
+        self.row = row
+
+    def __getitem__(self, key):
+        r, i = self.roster, self.row
+        if key == 'tutorial':
+            return r.tutorial_names[r.tutorial[i]]
+        if key == 'id':
+            return int(r.ids[i])
+        if key == 'school':
+            return r.school_names[r.school[i]]
+        if key == 'name':
+            return r.names[i]
+        if key == 'gender':
+            return r.gender_names[r.gender[i]]
+        if key == 'cgpa':
+            return float(r.cgpa[i])
+        if key == 'team':
+            return int(r.team[i])
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key != 'team':
+            raise KeyError(f"Roster column '{key}' is read-only")
+        self.roster.team[self.row] = value
+
+    def __delitem__(self, key):
+        raise KeyError(f"Roster column '{key}' cannot be removed")
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __reduce__(self):
+        # Ship a plain dict to worker processes instead of the whole roster
+        return (dict, (dict(self),))
+
+
+def roster_rows(students):
+    """Row indices if every student is a view onto the same roster, otherwise None"""
+    if not students or not isinstance(students[0], StudentView):
+        return None
+    roster = students[0].roster
+    rows = []
+    for s in students:
+        if not isinstance(s, StudentView) or s.roster is not roster:
+            return None
+        rows.append(s.row)
+    return np.array(rows, dtype=np.intp)
@@ -0,0 +1,131 @@
+"""
+Per-team statistics table shared by the summary, the charts and the graphs.
+
+team_table() makes one pass over an allocation ({tutorial: [team, ...]}) and
+returns NumPy columns with one row per team, tutorials in the order given and
+teams in allocation order. column_table() and roster_table() build the same
+table for a saved allocation, from per-student columns or a Roster. Every
+report reads its numbers from this table instead of recounting the students
+itself.
+"""
+
+import numpy as np
+from roster import roster_rows, gender_code, STEM_SCHOOLS, MALE, FEMALE
+
+
+def _student_columns(students):
+    """Gender flag (MALE/FEMALE/OTHER), school code, school names and CGPA of every student"""
+    rows = roster_rows(students)
+    if rows is not None:
+        roster = students[0].roster
+        return roster.sex[rows], roster.school[rows], roster.school_names, roster.cgpa[rows]
+
+    # Plain dicts: code each distinct label once, then look the flags up per code
+    gender_codes, school_codes = {}, {}
+    gender = np.empty(len(students), dtype=np.int32)
+    school = np.empty(len(students), dtype=np.int32)
+    cgpa = np.empty(len(students), dtype=np.float64)
+    for i, s in enumerate(students):
+        gender[i] = gender_codes.setdefault(s['gender'], len(gender_codes))
+        school[i] = school_codes.setdefault(s['school'], len(school_codes))
+        cgpa[i] = s['cgpa']
+    gender_sex = np.array([gender_code(g) for g in gender_codes] or [0], dtype=np.int8)
+    return gender_sex[gender], school, list(school_codes), cgpa
+
+
+def team_table(tutorial_teams):
+    """Statistics for every team of every tutorial, as one row per team.
+
+    Keys: 'tutorials' (names) and 'bounds' (first row of each tutorial, plus the
+    end), then per team: 'tutorial' (index into 'tutorials'), 'size', 'male',
+    'female', 'stem', 'nonstem', 'cgpa_sum', 'cgpa_mean', 'cgpa_std' (sample std,
+    0 for one-member teams) and 'schools', a teams x 'school_names' count matrix
+    with the schools sorted by name.
+    """
+    tutorials = list(tutorial_teams)
+    sizes = [len(team) for tut in tutorials for team in tutorial_teams[tut]]
+    teams_per_tut = [len(tutorial_teams[tut]) for tut in tutorials]
+    students = [s for tut in tutorials for team in tutorial_teams[tut] for s in team]
+    sex, school, school_names, cgpa = _student_columns(students)
+    return _table(tutorials, teams_per_tut, np.array(sizes, dtype=np.int64), sex, school, school_names, cgpa)
+
+
+def column_table(tutorial, team, gender, school, cgpa):
+    """team_table() for an allocation given as per-student columns, e.g. a DataFrame's.
+
+    Teams are keyed by (tutorial, team) and ordered by tutorial then team, as a
+    pandas groupby would; students keep their input order within a team.
+    """
+    tutorials, tut = np.unique(np.asarray(tutorial), return_inverse=True)
+    gender_names, gender = np.unique(np.asarray(gender), return_inverse=True)
+    school_names, school = np.unique(np.asarray(school), return_inverse=True)
+    return _coded_table(tutorials.tolist(), tut, team, gender_names.tolist(), gender,
+                        school_names.tolist(), school, cgpa)
+
+
+def roster_table(roster):
+    """column_table() for a Roster's saved teams, read from its coded columns"""
+    rank = np.argsort(np.argsort(np.array(roster.tutorial_names, dtype=object)))
+    tutorials = sorted(roster.tutorial_names)
+    tut = rank[roster.tutorial] if len(rank) else np.zeros(0, dtype=np.int64)
+    return _coded_table(tutorials, tut, roster.team, roster.gender_names, roster.gender,
+                        roster.school_names, roster.school, roster.cgpa)
+
+
+def _coded_table(tutorials, tut, team, gender_names, gender, school_names, school, cgpa):
+    # tut indexes the sorted tutorial names; students are grouped by (tut, team), stably
+    _, team_code = np.unique(np.asarray(team), return_inverse=True)
+    order = np.lexsort((team_code, tut))
+    tut, team_code = tut[order], team_code[order]
+
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (tut[1:] != tut[:-1]) | (team_code[1:] != team_code[:-1])
+    starts = np.flatnonzero(first)
+    size = np.diff(np.append(starts, len(order))).astype(np.int64)
+    teams_per_tut = np.bincount(tut[starts], minlength=len(tutorials))
+
+    gender_sex = np.array([gender_code(g) for g in gender_names] or [0], dtype=np.int8)
+    return _table(tutorials, teams_per_tut, size, gender_sex[np.asarray(gender)[order]],
+                  np.asarray(school)[order], school_names, np.asarray(cgpa, dtype=np.float64)[order])
+
+
+def _table(tutorials, teams_per_tut, size, sex, school, school_names, cgpa):
+    """The team_table() dict from the students' columns, in team order"""
+    num_teams = len(size)
+    team = np.repeat(np.arange(num_teams), size)
+
+    # Schools as columns in name order; blank schools get no column
+    school_cols = sorted(name for name in set(school_names) if name)
+    col_of = {name: c for c, name in enumerate(school_cols)}
+    code_col = np.array([col_of.get(name, -1) for name in school_names] or [-1], dtype=np.int64)
+    col = code_col[school] if len(school) else np.zeros(0, dtype=np.int64)
+    stem_col = np.array([name in STEM_SCHOOLS for name in school_cols], dtype=bool)
+
+    known = col >= 0
+    num_cols = len(school_cols)
+    schools = np.bincount(team[known] * num_cols + col[known],
+                          minlength=num_teams * num_cols).reshape(num_teams, num_cols)
+    stem = schools[:, stem_col].sum(axis=1)
+
+    # Sums accumulate student by student in team order, same as the old loops
+    cgpa_sum = np.bincount(team, cgpa, minlength=num_teams)
+    cgpa_mean = cgpa_sum / np.maximum(size, 1)
+    diff = cgpa - cgpa_mean[team]
+    sq_diff = np.bincount(team, diff * diff, minlength=num_teams)
+    cgpa_std = np.where(size > 1, np.sqrt(sq_diff / np.maximum(size - 1, 1)), 0.0)
+
+    return {
+        'tutorials': tutorials,
+        'bounds': np.concatenate([[0], np.cumsum(teams_per_tut)]).astype(np.int64),
+        'tutorial': np.repeat(np.arange(len(tutorials)), teams_per_tut),
+        'size': size,
+        'male': np.bincount(team[sex == MALE], minlength=num_teams),
+        'female': np.bincount(team[sex == FEMALE], minlength=num_teams),
+        'stem': stem,
+        'nonstem': schools.sum(axis=1) - stem,
+        'school_names': school_cols,
+        'schools': schools,
+        'cgpa_sum': cgpa_sum,
+        'cgpa_mean': cgpa_mean,
+        'cgpa_std': cgpa_std,
+    }
@@ -1,561 +1,744 @@
-import random
-import csv
-import matplotlib.pyplot as plt
-import ipywidgets as widgets
-from IPython.display import display, clear_output
-
-STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
-
-def read_file(filename):
-    students = []
-    with open(filename, 'r', newline='') as file:
-        reader = csv.DictReader(file)
-        
-        for row in reader:
-            if not any(row.values()):
-                continue
-            try:
-                student = {
-                    'tutorial': row['Tutorial Group'],
-                    'id': int(row['Student ID']),
-                    'school': row['School'],
-                    'name': row['Name'],
-                    'gender': row['Gender'],
-                    'cgpa': float(row['CGPA']),
-                    'team': 0
-                }
-                students.append(student)
-            except (ValueError, KeyError) as e:
-                print(f"Warning: Invalid data for row {row}: {e}")
-                continue
-    
-    print(f"Loaded {len(students)} students")
-    return students
-
-def calculate_ratio(students, team_size):
-    male, female = count_gender(students)
-    stem, nonstem = count_stem(students)
-    total = male + female
-    
-    if total == 0:
-        default_max = max(1, (team_size + 1) // 2)
-        return {'male_max': default_max, 'female_max': default_max,
-                'stem_max': default_max, 'nonstem_max': default_max}
-    
-    tolerance = 0.15 + (team_size - 5) * 0.02
-    male_max = int(team_size * min(male / total + tolerance, 1) + 0.5)
-    female_max = int(team_size * min(female / total + tolerance, 1) + 0.5)
-    stem_max = int(team_size * min(stem / total + tolerance, 1) + 0.5)
-    nonstem_max = int(team_size * min(nonstem / total + tolerance, 1) + 0.5)
-    
-    return {'male_max': max(1, male_max), 'female_max': max(1, female_max),
-            'stem_max': max(1, stem_max), 'nonstem_max': max(1, nonstem_max)}
-
-def count_gender(team):
-    male = 0
-    female = 0
-
-    for student in team:
-        if student['gender'].upper() in ['M', 'MALE']:
-            male += 1
-        elif student['gender'].upper() in ['F', 'FEMALE']:
-            female += 1
-    return male, female
-
-def count_stem(team):
-    stem = 0
-    nonstem = 0
-    for student in team:
-        if student['school'] in STEM_SCHOOLS:
-            stem += 1
-        elif student['school']:
-            nonstem += 1
-    return stem, nonstem
-
-def check_balanced(team, student, team_size, ratio):
-    # Enhanced balance checking with school concentration and CGPA variance prevention
-    if len(team) >= team_size:
-        return False
-
-    temp_team = team + [student]
-
-    # Check 1: Gender balance
-    male, female = count_gender(temp_team)
-    if male > ratio['male_max'] or female > ratio['female_max']:
-        return False
-
-    # Check 2: STEM/Non-STEM balance
-    stem, nonstem = count_stem(temp_team)
-    if stem > ratio['stem_max'] or nonstem > ratio['nonstem_max']:
-        return False
-
-    # Check 3: School concentration (NEW)
-    # Prevent more than 2 students from same school
-    school_counts = {}
-    for s in temp_team:
-        sch = s['school']
-        if sch:
-            if sch not in school_counts:
-                school_counts[sch] = 0
-            school_counts[sch] += 1
-
-    # Reject if any school has 3+ students
-    max_same_school = max(school_counts.values()) if school_counts else 0
-    if max_same_school > 2:
-        return False
-
-    # Check 4: CGPA spread (NEW)
-    # Prevent extreme CGPA variance
-    if len(temp_team) > 1:
-        cgpas = [s['cgpa'] for s in temp_team]
-        mean = sum(cgpas) / len(cgpas)
-        sq_diff = sum((c - mean) ** 2 for c in cgpas)
-        std_dev = (sq_diff / (len(cgpas) - 1)) ** 0.5
-
-        # Allow slightly higher std for smaller partial teams
-        max_std = 0.40 if len(temp_team) < team_size else 0.35
-        if std_dev > max_std:
-            return False
-
-    return True
-
-def group_by_tutorial(students):
-    tutorials = {}
-    for student in students:
-        tut = student['tutorial']
-        if tut not in tutorials:
-            tutorials[tut] = []
-        tutorials[tut].append(student)
-    print(f"Found {len(tutorials)} tutorial groups")
-    return tutorials
-
-def sort_by_cgpa(students):
-    n = len(students)
-    for i in range(n):
-        max_idx = i
-        for j in range(i + 1, n):
-            if students[j]['cgpa'] > students[max_idx]['cgpa']:
-                max_idx = j
-        students[i], students[max_idx] = students[max_idx], students[i]
-    return students
-    
-
-def form_teams(students, team_size):
-    if len(students) == 0:
-        return []
-    
-    ratio = calculate_ratio(students, team_size)
-    total = len(students)
-    num_teams = (total + team_size - 1) // team_size
-    
-    base_size = total // num_teams
-    extra = total % num_teams
-    team_sizes = [base_size + 1 if i < extra else base_size for i in range(num_teams)]
-    
-    teams = [[] for _ in range(num_teams)]
-    placed_ids = {}
-    
-    # Only separate by gender
-    males, females = [], []
-    for s in students:
-        if s['gender'].upper() in ['M', 'MALE']:
-            males.append(s)
-        elif s['gender'].upper() in ['F', 'FEMALE']:
-            females.append(s)
-    
-    # Sort by CGPA
-    males = sort_by_cgpa(males)
-    females = sort_by_cgpa(females)
-    
-    # Determine minority and majority gender groups
-    gender_minority, gender_majority = (males, females) if len(males) <= len(females) else (females, males)
-    
-    # Shuffle majority to add randomness
-    random.shuffle(gender_majority)
-    
-    # Distribute minority gender first (round-robin)
-    for i in range(len(gender_minority)):
-        student = gender_minority[i]
-        if student['id'] not in placed_ids:
-            teams[i % num_teams].append(student)
-            placed_ids[student['id']] = True
-    
-    # Distribute majority gender with balance checking
-    current_team = 0
-    for student in gender_majority:
-        if student['id'] in placed_ids:
-            continue
-        
-        placed = False
-        for offset in range(num_teams):
-            idx = (current_team + offset) % num_teams
-            if len(teams[idx]) < team_sizes[idx] and \
-               check_balanced(teams[idx], student, team_sizes[idx], ratio):
-                teams[idx].append(student)
-                placed_ids[student['id']] = True
-                placed = True
-                current_team = (idx + 1) % num_teams
-                break
-        
-        if not placed:
-            # If can't place with balance, find team with most space
-            best_team = 0
-            max_space = team_sizes[0] - len(teams[0])
-            for t in range(1, num_teams):
-                space = team_sizes[t] - len(teams[t])
-                if space > max_space:
-                    max_space = space
-                    best_team = t
-            teams[best_team].append(student)
-            placed_ids[student['id']] = True
-            current_team = (best_team + 1) % num_teams
-    
-    return teams
-
-def write_csv(all_students, filename):
-    groups = {}
-    for student in all_students:
-        key = (student['tutorial'], student['team'])
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(student)
-    
-    keys_list = list(groups.keys())
-    n = len(keys_list)
-    for i in range(n):
-        for j in range(i + 1, n):
-            if keys_list[i] > keys_list[j]:
-                keys_list[i], keys_list[j] = keys_list[j], keys_list[i]
-    
-    with open(filename, 'w', newline='') as file:
-        writer = csv.DictWriter(file, 
-                                fieldnames=['Tutorial Group', 'Student ID', 'School', 'Name', 'Gender', 'CGPA', 'Team'],
-                                extrasaction='ignore')
-        writer.writeheader()
-        for key in keys_list:
-            for student in groups[key]:
-                row = {
-                    'Tutorial Group': student['tutorial'],
-                    'Student ID': student['id'],
-                    'School': student['school'],
-                    'Name': student['name'],
-                    'Gender': student['gender'],
-                    'CGPA': student['cgpa'],
-                    'Team': student['team']
-                }
-                writer.writerow(row)
-    print(f"Saved to {filename}")
-    
-
-
-def print_summary(tutorial_teams):
-    """Simple team summary showing gender, schools, and CGPA stats"""
-    print("\n" + "="*120)
-    print(f"{'TEAM COMPOSITION SUMMARY':^120}")
-    print("="*120)
-    print(f"{'Tutorial':<10} {'Team':<6} {'Size':<5} {'Gender':<10} {'Schools':<40} {'Avg CGPA':<10} {'Std Dev':<10}")
-    print("-"*120)
-
-    # Manual sort of tutorial keys
-    tut_keys = []
-    for key in tutorial_teams:
-        tut_keys.append(key)
-
-    for i in range(len(tut_keys)):
-        for j in range(i + 1, len(tut_keys)):
-            if tut_keys[i] > tut_keys[j]:
-                tut_keys[i], tut_keys[j] = tut_keys[j], tut_keys[i]
-
-    # Track overall stats
-    total_teams = 0
-    total_students = 0
-    total_cgpa_sum = 0.0
-
-    for tut in tut_keys:
-        for i in range(len(tutorial_teams[tut])):
-            team = tutorial_teams[tut][i]
-            total_teams += 1
-            total_students += len(team)
-
-            # Gender counts
-            m, f = count_gender(team)
-            gender_str = f"{m}M/{f}F"
-
-            # School counts
-            school_counts = {}
-            for st in team:
-                sch = st['school']
-                if sch:
-                    if sch not in school_counts:
-                        school_counts[sch] = 0
-                    school_counts[sch] += 1
-
-            # Format schools string
-            schools_list = []
-            for sch in school_counts:
-                schools_list.append(f"{sch}:{school_counts[sch]}")
-            schools_str = ", ".join(schools_list)
-
-            # CGPA calculations
-            cgpa_list = []
-            cgpa_sum = 0.0
-            for st in team:
-                cgpa_sum += st['cgpa']
-                cgpa_list.append(st['cgpa'])
-
-            mean_cgpa = cgpa_sum / len(team)
-            total_cgpa_sum += cgpa_sum
-
-            # Calculate std dev
-            if len(team) > 1:
-                sq_diff = 0.0
-                for cgpa in cgpa_list:
-                    diff = cgpa - mean_cgpa
-                    sq_diff += diff * diff
-                std_dev = (sq_diff / (len(team) - 1)) ** 0.5
-            else:
-                std_dev = 0.0
-
-            # Print row
-            print(f"{tut:<10} T{i+1:<5} {len(team):<5} {gender_str:<10} {schools_str:<40} {mean_cgpa:>8.2f}  {std_dev:>9.3f}")
-
-    # Print overall summary
-    print("="*120)
-    print(f"{'OVERALL STATISTICS':^120}")
-    print("="*120)
-
-    avg_size = total_students / total_teams if total_teams > 0 else 0
-    overall_avg_cgpa = total_cgpa_sum / total_students if total_students > 0 else 0
-
-    print(f"Total Tutorials: {len(tut_keys)}")
-    print(f"Total Teams: {total_teams}")
-    print(f"Total Students: {total_students}")
-    print(f"Average Team Size: {avg_size:.2f}")
-    print(f"Overall Average CGPA: {overall_avg_cgpa:.3f}")
-    print("="*120 + "\n")
-
-def visualize_tutorial_group(tutGrp, tutGrpName):
-    """Create visualizations: Gender, CGPA Diversity, School Diversity (Stacked), and Average CGPA"""
-    team_ids = [f"Team {i+1}" for i in range(len(tutGrp))]
-    avg_cgpas = []
-    male_counts = []
-    female_counts = []
-    cgpa_std_list = []
-    
-    # Collect all unique schools
-    all_schools = []
-    for team in tutGrp:
-        for student in team:
-            school = student["school"]
-            if school and school not in all_schools:
-                all_schools.append(school)
-    
-    # Manual sort (selection sort)
-    for i in range(len(all_schools)):
-        min_idx = i
-        for j in range(i + 1, len(all_schools)):
-            if all_schools[j] < all_schools[min_idx]:
-                min_idx = j
-        all_schools[i], all_schools[min_idx] = all_schools[min_idx], all_schools[i]
-        
-    school_counts = {}
-    for school in all_schools:
-        school_counts[school] = []
-
-    # Process each team
-    for team in tutGrp:
-        males = 0
-        females = 0
-        cgpa_total = 0.0
-        team_cgpas = []
-        
-        for student in team:
-            if student["gender"].upper() in ['M', 'MALE']:
-                males += 1
-            elif student["gender"].upper() in ['F', 'FEMALE']:
-                females += 1
-            
-            cgpa = student["cgpa"]
-            cgpa_total += cgpa
-            team_cgpas.append(cgpa)
-            
-        male_counts.append(males)
-        female_counts.append(females)
-        
-        # Calculate Average CGPA
-        avg_cgpas.append(cgpa_total / len(team))
-
-        # Manual std dev calculation
-        if len(team_cgpas) > 1:
-            mean = sum(team_cgpas) / len(team_cgpas)
-            squared_diffs = 0.0
-            for cgpa_val in team_cgpas:
-                diff = cgpa_val - mean
-                squared_diffs += diff * diff
-            variance = squared_diffs / (len(team_cgpas) - 1)
-            std_dev = variance ** 0.5
-        else:
-            std_dev = 0.0
-        cgpa_std_list.append(std_dev)
-
-        # School counts
-        team_school_tally = {}
-        for school in all_schools:
-            team_school_tally[school] = 0
-        
-        for student in team:
-            school = student["school"]
-            if school:
-                team_school_tally[school] += 1
-        
-        for school in all_schools:
-            school_counts[school].append(team_school_tally[school])
-
-    # --- VISUALIZATIONS ---
-
-    # 1. Gender Distribution
-    plt.figure(figsize=(10,5))
-    plt.bar(team_ids, male_counts, label="Male", color='#3498db', edgecolor='white', linewidth=0.5)
-    plt.bar(team_ids, female_counts, bottom=male_counts, label="Female", color='#e74c3c', edgecolor='white', linewidth=0.5)
-    plt.title(f"Gender Distribution in {tutGrpName}", fontsize=14, fontweight='bold')
-    plt.xlabel("Teams")
-    plt.ylabel("Number of Students")
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-    # ---
-
-    # 2. CGPA Diversity (Std Dev)
-    plt.figure(figsize=(10,5))
-    plt.bar(team_ids, cgpa_std_list, color='#9b59b6', edgecolor='black', linewidth=1.2, alpha=0.8)
-    plt.title(f"CGPA Diversity (Std Dev) in {tutGrpName}", fontsize=14, fontweight='bold')
-    plt.xlabel("Teams")
-    plt.ylabel("Standard Deviation")
-    total_std = sum(cgpa_std_list)
-    avg_std = total_std / len(cgpa_std_list) if cgpa_std_list else 0
-    plt.axhline(y=avg_std, color='red', linestyle='--', linewidth=2, label=f'Average Std Dev: {avg_std:.2f}')
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-    # ---
-
-    # 3. Individual School Distributions (REMOVED as requested, using stacked plot instead)
-    # The original plot has been commented out and replaced by a single stacked bar chart (new section 5)
-    
-    # ---
-
-    # 4. Average CGPA per Team
-    plt.figure(figsize=(10,5))
-    bars = plt.bar(team_ids, avg_cgpas, color='#9b59b6', edgecolor='black', linewidth=1.2)
-    plt.title(f"Average CGPA per Team in {tutGrpName}", fontsize=14, fontweight='bold')
-    plt.xlabel("Teams")
-    plt.ylabel("Average CGPA")
-    plt.ylim(0, 5)
-    total_avg = sum(avg_cgpas)
-    overall_avg = total_avg / len(avg_cgpas) if avg_cgpas else 0
-    plt.axhline(y=overall_avg, color='red', linestyle='--', linewidth=2, label=f'Overall Avg: {overall_avg:.2f}')
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-    # ---
-
-    # 5. School Diversity (Stacked Bar Chart - The plot you wanted)
-    # Define colors
-    colors = [ 
-        "#1f77b4", "#ff7f0e", "#2ca02c", "#9467bd", "#8c564b", 
-        "#e377c2", "#7f7f7f", "#bcbd22", "#17becf", "#3498db",
-        "#d62728", "#8dd3c7", "#fdb462", "#b3de69", "#fb8072"
-    ]
-
-    # Map each school to a color by index
-    school_colors = {}
-    for i, school in enumerate(all_schools):
-        school_colors[school] = colors[i % len(colors)]
-
-    plt.figure(figsize=(12, 6))
-
-    # Stack raw counts instead of percentages
-    bottom = [0] * len(team_ids)
-    for school in all_schools:
-        # Use actual student counts
-        values = school_counts[school]
-        plt.bar(team_ids, values, bottom=bottom, 
-                color=school_colors[school], label=school)
-        # Update bottom for stacking
-        for j in range(len(bottom)):
-            bottom[j] += values[j]
-
-    plt.xlabel("Teams")
-    plt.ylabel("Total Number of Students")
-    plt.title(f"School Diversity (Team Size & Composition) - {tutGrpName}")
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    plt.show()
-
-from IPython.display import display
-import ipywidgets as widgets
-team_size_widget = widgets.IntText(
-    value=5,
-    description='Team Size:',
-    style={'description_width': 'initial'}
-)
-
-run_button = widgets.Button(
-    description='Generate Teams',
-    button_style='success',
-    icon='users'
-)
-
-output = widgets.Output()
-
-# --- Callback function ---
-def run_allocation(b):
-    with output:
-        output.clear_output()
-        team_size = team_size_widget.value
-        print(f"Starting team allocation with team size {team_size}...\n")
-        
-        # Load students
-        try:
-            all_students = read_file('records.csv')
-        except FileNotFoundError:
-            print("Error: 'records.csv' not found.")
-            return
-        
-        tutorials = group_by_tutorial(all_students)
-        
-        # Team formation
-        team_number = 1
-        tutorial_teams = {}
-        
-        for tut_name, tut_students in tutorials.items():
-            teams = form_teams(tut_students, team_size)
-            tutorial_teams[tut_name] = teams
-            
-            for team in teams:
-                for student in team:
-                    student['team'] = team_number
-                team_number += 1
-        
-        # Summary + CSV
-        print_summary(tutorial_teams)
-        write_csv(all_students, 'FCS1_Team_Allocation.csv')
-        print("\nDONE! Check CSV: 'FCS1_Team_Allocation.csv'\n")
-        
-        # Visualizations
-        for tut_name, teams in tutorial_teams.items():
-            print(f"Generating visualizations for {tut_name}...")
-            visualize_tutorial_group(teams, tut_name)
-
-# Link button to callback
-run_button.on_click(run_allocation)
-
-# Display widgets
-display(widgets.VBox([
-    widgets.HBox([team_size_widget, run_button]),
-    output
-]))
-
+import random
+import csv
+import hashlib
+import heapq
+import functools
+import itertools
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+import ipywidgets as widgets
+from IPython.display import display, clear_output
+from roster import Roster, roster_rows, MALE, FEMALE
+from local_search import refine_teams
+from flow_engine import flow_form_teams
+from allocation_cache import ResultCache, DEFAULT_DIR
+import allocation_driver
+from allocation_driver import output_row, stream_teams, count_tutorials
+from team_stats import team_table
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+OUTPUT_FIELDS = ['Tutorial Group', 'Student ID', 'School', 'Name', 'Gender', 'CGPA', 'Team']
+WRITE_BUFFER = 1 << 20
+# Limits feasible() places students under; refine_teams is held to the same ones
+SCHOOL_LIMIT = 2
+PARTIAL_TEAM_STD = 0.40
+FULL_TEAM_STD = 0.35
+# Keys don't say which script's form_teams made a result, so each script caches in its own directory
+ALLOCATION_CACHE_DIR = os.path.join(DEFAULT_DIR, 'advanced')
+
+def read_file(filename):
+    # Columnar roster (memory-mapped from the cache when the CSV is unchanged); StudentView
+    # rows are only made by group_by_tutorial, a tutorial at a time
+    roster = Roster.load(filename)
+    print(f"Loaded {len(roster)} students")
+    return roster
+
+def parse_students(reader):
+    # Plain dict per row, for streaming where no whole-roster Roster is built
+    for row in reader:
+        if not any(row.values()):
+            continue
+        try:
+            yield {
+                'tutorial': row['Tutorial Group'],
+                'id': int(row['Student ID']),
+                'school': row['School'],
+                'name': row['Name'],
+                'gender': row['Gender'],
+                'cgpa': float(row['CGPA']),
+                'team': 0
+            }
+        except (ValueError, KeyError) as e:
+            print(f"Warning: Invalid data for row {row}: {e}")
+            continue
+
+def calculate_ratio(students, team_size):
+    male, female = count_gender(students)
+    stem, nonstem = count_stem(students)
+    total = male + female
+    
+    if total == 0:
+        default_max = max(1, (team_size + 1) // 2)
+        return {'male_max': default_max, 'female_max': default_max,
+                'stem_max': default_max, 'nonstem_max': default_max}
+    
+    tolerance = 0.15 + (team_size - 5) * 0.02
+    male_max = int(team_size * min(male / total + tolerance, 1) + 0.5)
+    female_max = int(team_size * min(female / total + tolerance, 1) + 0.5)
+    stem_max = int(team_size * min(stem / total + tolerance, 1) + 0.5)
+    nonstem_max = int(team_size * min(nonstem / total + tolerance, 1) + 0.5)
+    
+    return {'male_max': max(1, male_max), 'female_max': max(1, female_max),
+            'stem_max': max(1, stem_max), 'nonstem_max': max(1, nonstem_max)}
+
+def count_gender(team):
+    rows = roster_rows(team)
+    if rows is not None:
+        return team[0].roster.count_gender(rows)
+
+    male = 0
+    female = 0
+
+    for student in team:
+        if student['gender'].upper() in ['M', 'MALE']:
+            male += 1
+        elif student['gender'].upper() in ['F', 'FEMALE']:
+            female += 1
+    return male, female
+
+def count_stem(team):
+    rows = roster_rows(team)
+    if rows is not None:
+        return team[0].roster.count_stem(rows)
+
+    stem = 0
+    nonstem = 0
+    for student in team:
+        if student['school'] in STEM_SCHOOLS:
+            stem += 1
+        elif student['school']:
+            nonstem += 1
+    return stem, nonstem
+
+class TeamTable:
+    """Counters for all teams of a tutorial as arrays, so one candidate is checked against every team at once"""
+    def __init__(self, team_sizes, ratio, num_schools):
+        num_teams = len(team_sizes)
+        self.capacity = np.array(team_sizes)
+        self.size = np.zeros(num_teams, dtype=int)
+        # Columns: male, female, stem, nonstem
+        self.counts = np.zeros((num_teams, 4), dtype=int)
+        self.caps = np.array([ratio['male_max'], ratio['female_max'], ratio['stem_max'], ratio['nonstem_max']])
+        self.schools = np.zeros((num_teams, max(num_schools, 1)), dtype=int)
+        self.max_school = np.zeros(num_teams, dtype=int)
+        self.cgpa_sum = np.zeros(num_teams)
+        self.cgpa_sq = np.zeros(num_teams)
+        self.members = [[] for _ in range(num_teams)]
+        # Lazily updated max-heap of remaining space
+        self.space_heap = [(-size, t) for t, size in enumerate(team_sizes)]
+        heapq.heapify(self.space_heap)
+
+    def roomiest(self):
+        # Space only shrinks, so a heap key can only overstate it; re-key stale tops
+        # until the top is current. Ties go to the lowest index.
+        while True:
+            key, team = self.space_heap[0]
+            space = int(self.capacity[team] - self.size[team])
+            if -key == space:
+                return team
+            heapq.heapreplace(self.space_heap, (-space, team))
+
+    def feasible(self, attrs, school, cgpa, teams=slice(None)):
+        """Which teams (all, or the given indices) can take the student under the four balance checks"""
+        size = self.size[teams] + 1
+        capacity = self.capacity[teams]
+
+        # Check 1 and 2: Gender and STEM/Non-STEM caps
+        ok = size <= capacity
+        ok &= (self.counts[teams] + attrs <= self.caps).all(axis=1)
+
+        # Check 3: School concentration - reject if any school has 3+ students
+        max_same_school = self.max_school[teams]
+        if school >= 0:
+            max_same_school = np.maximum(max_same_school, self.schools[teams, school] + 1)
+        ok &= max_same_school <= SCHOOL_LIMIT
+
+        # Check 4: CGPA spread from the running sum and sum of squares, allowing
+        # slightly higher std for smaller partial teams
+        total = self.cgpa_sum[teams] + cgpa
+        sq_diff = self.cgpa_sq[teams] + cgpa * cgpa - total * total / size
+        std_dev = np.sqrt(np.maximum(sq_diff, 0.0) / np.maximum(size - 1, 1))
+        max_std = np.where(size < capacity, PARTIAL_TEAM_STD, FULL_TEAM_STD)
+        ok &= (size == 1) | (std_dev <= max_std)
+        return ok
+
+    def fits(self, team, attrs, school, cgpa):
+        # The one-team case of feasible()
+        return bool(self.feasible(attrs, school, cgpa, [team])[0])
+
+    def add(self, team, student, attrs, school, cgpa):
+        self.members[team].append(student)
+        self.size[team] += 1
+        self.counts[team] += attrs
+        if school >= 0:
+            self.schools[team, school] += 1
+            self.max_school[team] = max(self.max_school[team], self.schools[team, school])
+        self.cgpa_sum[team] += cgpa
+        self.cgpa_sq[team] += cgpa * cgpa
+
+def student_codes(students):
+    """Attribute matrix (male, female, stem, nonstem), school code (-1 if blank) and CGPA per student"""
+    rows = roster_rows(students)
+    if rows is not None:
+        roster = students[0].roster
+        sex, stem, nonstem = roster.sex[rows], roster.stem[rows], roster.nonstem[rows]
+        attrs = np.column_stack([sex == MALE, sex == FEMALE, stem, nonstem]).astype(int)
+        school = roster.school[rows].astype(int)
+        known = np.array([bool(name) for name in roster.school_names], dtype=bool)
+        school[~known[school]] = -1
+        return attrs, school, roster.cgpa[rows], len(roster.school_names)
+
+    attrs = np.zeros((len(students), 4), dtype=int)
+    school = np.full(len(students), -1)
+    school_codes = {}
+    for i, s in enumerate(students):
+        gender = s['gender'].upper()
+        attrs[i, 0] = gender in ['M', 'MALE']
+        attrs[i, 1] = gender in ['F', 'FEMALE']
+        attrs[i, 2] = s['school'] in STEM_SCHOOLS
+        attrs[i, 3] = s['school'] not in STEM_SCHOOLS and bool(s['school'])
+        if s['school']:
+            school[i] = school_codes.setdefault(s['school'], len(school_codes))
+    cgpa = np.array([s['cgpa'] for s in students], dtype=float)
+    return attrs, school, cgpa, len(school_codes)
+
+def group_by_tutorial(students):
+    if isinstance(students, Roster):
+        # Straight from the roster's tutorial index, without reading every row's label
+        tutorials = students.tutorial_views()
+    else:
+        tutorials = {}
+        for student in students:
+            tut = student['tutorial']
+            if tut not in tutorials:
+                tutorials[tut] = []
+            tutorials[tut].append(student)
+    print(f"Found {len(tutorials)} tutorial groups")
+    return tutorials
+
+def sort_by_cgpa(students):
+    # Stable O(n log n) sort, highest CGPA first, ties broken by student ID
+    students.sort(key=lambda s: (-s['cgpa'], s['id']))
+    return students
+
+def partition_students(students):
+    """Split a tutorial into STEM/non-STEM and male/female buckets in one pass, each sorted by CGPA"""
+    rows = roster_rows(students)
+    if rows is not None:
+        # One lexsort over the roster columns, then boolean masks keep that order per bucket
+        roster = students[0].roster
+        order = np.lexsort((roster.ids[rows], -roster.cgpa[rows]))
+        ranked = rows[order]
+        ranked_students = [students[i] for i in order]
+        masks = {'stem': roster.stem[ranked], 'nonstem': roster.nonstem[ranked],
+                 'male': roster.sex[ranked] == MALE, 'female': roster.sex[ranked] == FEMALE}
+        return {name: [ranked_students[i] for i in np.flatnonzero(mask)] for name, mask in masks.items()}
+
+    buckets = {'stem': [], 'nonstem': [], 'male': [], 'female': []}
+    for s in students:
+        if s['school'] in STEM_SCHOOLS:
+            buckets['stem'].append(s)
+        elif s['school']:
+            buckets['nonstem'].append(s)
+
+        gender = s['gender'].upper()
+        if gender in ['M', 'MALE']:
+            buckets['male'].append(s)
+        elif gender in ['F', 'FEMALE']:
+            buckets['female'].append(s)
+
+    for bucket in buckets.values():
+        sort_by_cgpa(bucket)
+    return buckets
+
+def form_teams(students, team_size, refine_time=0.0, engine='greedy', seed=None, buckets=None, stats=None):
+    """Split one tutorial into teams of about team_size
+
+    buckets can be a partition_students() result computed earlier (it is copied, not
+    shuffled in place). If stats is a dict, stats['fallback'] counts students that
+    fitted no team and went to the one with the most space.
+    """
+    if len(students) == 0:
+        return []
+    
+    # A seed gives the same teams for the same roster every time
+    rng = random.Random(seed) if seed is not None else random
+    
+    ratio = calculate_ratio(students, team_size)
+    total = len(students)
+    num_teams = (total + team_size - 1) // team_size
+    
+    base_size = total // num_teams
+    extra = total % num_teams
+    team_sizes = [base_size + 1 if i < extra else base_size for i in range(num_teams)]
+    
+    if engine == 'flow':
+        # Exact min-cost-flow allocation instead of the greedy passes below
+        teams = flow_form_teams(students, team_sizes, ratio, school_limit=SCHOOL_LIMIT)
+        refine_teams(teams, ratio, refine_time, school_max=SCHOOL_LIMIT, max_std=FULL_TEAM_STD, rng=rng)
+        return teams
+    if engine != 'greedy':
+        raise ValueError(f"Unknown allocation engine '{engine}'")
+    
+    attrs, schools, cgpas, num_schools = student_codes(students)
+    position = {id(s): i for i, s in enumerate(students)}
+    teams = TeamTable(team_sizes, ratio, num_schools)
+    placed_ids = {}
+    
+    def place(team, student):
+        i = position[id(student)]
+        teams.add(team, student, attrs[i], schools[i], cgpas[i])
+        placed_ids[student['id']] = True
+    
+    # Partition and sort by CGPA in one pass, only the gender buckets are used here
+    if buckets is None:
+        buckets = partition_students(students)
+    # Copies, since the majority gets shuffled below
+    males, females = list(buckets['male']), list(buckets['female'])
+    
+    # Determine minority and majority gender groups
+    gender_minority, gender_majority = (males, females) if len(males) <= len(females) else (females, males)
+    
+    # Shuffle majority to add randomness
+    rng.shuffle(gender_majority)
+    
+    # Distribute minority gender first (round-robin)
+    for i in range(len(gender_minority)):
+        student = gender_minority[i]
+        if student['id'] not in placed_ids:
+            place(i % num_teams, student)
+    
+    # Distribute majority gender with balance checking
+    current_team = 0
+    for student in gender_majority:
+        if student['id'] in placed_ids:
+            continue
+        
+        # Check every team at once and take the first feasible one from current_team onwards
+        i = position[id(student)]
+        feasible = teams.feasible(attrs[i], schools[i], cgpas[i]).nonzero()[0]
+        if len(feasible):
+            later = feasible[feasible >= current_team]
+            idx = int(later[0]) if len(later) else int(feasible[0])
+            place(idx, student)
+            current_team = (idx + 1) % num_teams
+        else:
+            # If can't place with balance, find team with most space
+            if stats is not None:
+                stats['fallback'] = stats.get('fallback', 0) + 1
+            best_team = teams.roomiest()
+            place(best_team, student)
+            current_team = (best_team + 1) % num_teams
+    
+    # Optional swap-based clean-up of whatever the greedy pass left unbalanced, under
+    # the same school and full-team CGPA limits as feasible()
+    refine_teams(teams.members, ratio, refine_time, school_max=SCHOOL_LIMIT, max_std=FULL_TEAM_STD, rng=rng)
+    return teams.members
+
+# Scoring, multi-start, the process pool, caching and team numbering are shared
+# with the other script; only this script's form_teams is plugged in
+allocate_tutorials = functools.partial(allocation_driver.allocate_tutorials, form_teams)
+
+def sweep_team_sizes(filename, sizes=range(4, 11), workers=1, refine_time=0.0, engine='greedy', seed=None):
+    """Allocate the roster once per team size and print a table of balance metrics
+
+    The roster is read, grouped and partitioned once here; the sizes are run by
+    allocation_driver.sweep_team_sizes.
+    """
+    students = read_file(filename)
+    tutorials = group_by_tutorial(students)
+    buckets = {tut: partition_students(tut_students) for tut, tut_students in tutorials.items()}
+    return allocation_driver.sweep_team_sizes(form_teams, calculate_ratio, tutorials, buckets, sizes, workers,
+                                              refine_time, engine, seed)
+
+def write_csv(all_students, filename):
+    if isinstance(all_students, Roster):
+        roster, rows = all_students, np.arange(len(all_students))
+    else:
+        rows = roster_rows(all_students)
+        roster = all_students[0].roster if rows is not None else None
+    with open(filename, 'w', newline='', buffering=WRITE_BUFFER) as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_FIELDS)
+        if roster is not None:
+            writer.writerows(roster_output_rows(roster, rows))
+        else:
+            # Bucket by (tutorial, team) in one pass; only the bucket keys get sorted
+            groups = {}
+            for student in all_students:
+                key = (student['tutorial'], student['team'])
+                if key not in groups:
+                    groups[key] = []
+                groups[key].append(output_row(student))
+            for key in sorted(groups):
+                writer.writerows(groups[key])
+    print(f"Saved to {filename}")
+
+def roster_output_rows(roster, rows):
+    """Output rows straight from the roster columns, ordered by tutorial name then team"""
+    # Rank of each tutorial code by name; lexsort is stable so input order holds within a team
+    tut_rank = np.argsort(np.argsort(np.array(roster.tutorial_names, dtype=object)))
+    order = rows[np.lexsort((roster.team[rows], tut_rank[roster.tutorial[rows]]))]
+    return zip([roster.tutorial_names[t] for t in roster.tutorial[order]],
+               roster.ids[order].tolist(),
+               [roster.school_names[c] for c in roster.school[order]],
+               [roster.names[r] for r in order],
+               [roster.gender_names[g] for g in roster.gender[order]],
+               roster.cgpa[order].tolist(),
+               roster.team[order].tolist())
+
+def stream_allocation(in_filename, out_filename, team_size, refine_time=0.0, engine='greedy', seed=None):
+    """Allocate a roster already sorted by tutorial, holding only one tutorial in memory.
+
+    See allocation_driver.stream_teams: tutorials are written in input order. As in
+    allocate_tutorials, refine_time is the total budget, split evenly across tutorials.
+    """
+    tutorial_refine = refine_time / max(count_tutorials(in_filename), 1) if refine_time > 0 else 0.0
+    with open(in_filename, 'r', newline='') as infile, \
+         open(out_filename, 'w', newline='', buffering=WRITE_BUFFER) as outfile:
+        reader = csv.DictReader(infile)
+        writer = csv.writer(outfile)
+        writer.writerow(OUTPUT_FIELDS)
+        total, tutorials = stream_teams(form_teams, parse_students(reader), writer, team_size,
+                                        tutorial_refine, engine, seed)
+    
+    print(f"Streamed {total} students in {tutorials} tutorial groups to {out_filename}")
+
+
+def print_summary(tutorial_teams, table=None):
+    """Simple team summary showing gender, schools, and CGPA stats"""
+    if table is None:
+        table = team_table(tutorial_teams)
+
+    print("\n" + "="*120)
+    print(f"{'TEAM COMPOSITION SUMMARY':^120}")
+    print("="*120)
+    print(f"{'Tutorial':<10} {'Team':<6} {'Size':<5} {'Gender':<10} {'Schools':<40} {'Avg CGPA':<10} {'Std Dev':<10}")
+    print("-"*120)
+
+    tutorials = table['tutorials']
+    bounds = table['bounds']
+    school_names = table['school_names']
+    for t in sorted(range(len(tutorials)), key=lambda t: tutorials[t]):
+        tut = tutorials[t]
+        for row in range(bounds[t], bounds[t + 1]):
+            gender_str = f"{table['male'][row]}M/{table['female'][row]}F"
+            counts = table['schools'][row]
+            schools_str = ", ".join(f"{school_names[c]}:{counts[c]}" for c in np.flatnonzero(counts))
+
+            # Print row
+            print(f"{tut:<10} T{row - bounds[t] + 1:<5} {table['size'][row]:<5} {gender_str:<10} {schools_str:<40} "
+                  f"{table['cgpa_mean'][row]:>8.2f}  {table['cgpa_std'][row]:>9.3f}")
+
+    # Print overall summary
+    print("="*120)
+    print(f"{'OVERALL STATISTICS':^120}")
+    print("="*120)
+
+    total_teams = len(table['size'])
+    total_students = int(table['size'].sum())
+    avg_size = total_students / total_teams if total_teams > 0 else 0
+    overall_avg_cgpa = table['cgpa_sum'].sum() / total_students if total_students > 0 else 0
+
+    print(f"Total Tutorials: {len(tutorials)}")
+    print(f"Total Teams: {total_teams}")
+    print(f"Total Students: {total_students}")
+    print(f"Average Team Size: {avg_size:.2f}")
+    print(f"Overall Average CGPA: {overall_avg_cgpa:.3f}")
+    print("="*120 + "\n")
+
+def tutorial_chart_data(table, t):
+    """Chart numbers of the t-th tutorial in a team_table; plain lists, so they pickle cheaply to workers"""
+    lo, hi = table['bounds'][t], table['bounds'][t + 1]
+    counts = table['schools'][lo:hi]
+    # Only the schools that appear in this tutorial, already in name order
+    present = np.flatnonzero(counts.sum(axis=0))
+    all_schools = [table['school_names'][c] for c in present]
+    return {
+        'team_ids': [f"Team {i+1}" for i in range(hi - lo)],
+        'male_counts': table['male'][lo:hi].tolist(),
+        'female_counts': table['female'][lo:hi].tolist(),
+        'cgpa_std_list': table['cgpa_std'][lo:hi].tolist(),
+        'avg_cgpas': table['cgpa_mean'][lo:hi].tolist(),
+        'all_schools': all_schools,
+        'school_counts': {school: counts[:, c].tolist() for school, c in zip(all_schools, present)},
+    }
+
+# --- VISUALIZATIONS ---
+# Each chart draws onto a figure it is given, so the same figure can be cleared
+# and reused for the next tutorial when rendering to files
+
+def draw_gender_chart(fig, data, tutGrpName):
+    """1. Gender Distribution"""
+    team_ids = data['team_ids']
+    ax = fig.add_subplot()
+    ax.bar(team_ids, data['male_counts'], label="Male", color='#3498db', edgecolor='white', linewidth=0.5)
+    ax.bar(team_ids, data['female_counts'], bottom=data['male_counts'], label="Female", color='#e74c3c', edgecolor='white', linewidth=0.5)
+    ax.set_title(f"Gender Distribution in {tutGrpName}", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Teams")
+    ax.set_ylabel("Number of Students")
+    ax.legend()
+    fig.tight_layout()
+
+def draw_cgpa_std_chart(fig, data, tutGrpName):
+    """2. CGPA Diversity (Std Dev)"""
+    cgpa_std_list = data['cgpa_std_list']
+    ax = fig.add_subplot()
+    ax.bar(data['team_ids'], cgpa_std_list, color='#9b59b6', edgecolor='black', linewidth=1.2, alpha=0.8)
+    ax.set_title(f"CGPA Diversity (Std Dev) in {tutGrpName}", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Teams")
+    ax.set_ylabel("Standard Deviation")
+    total_std = sum(cgpa_std_list)
+    avg_std = total_std / len(cgpa_std_list) if cgpa_std_list else 0
+    ax.axhline(y=avg_std, color='red', linestyle='--', linewidth=2, label=f'Average Std Dev: {avg_std:.2f}')
+    ax.legend()
+    fig.tight_layout()
+
+def draw_avg_cgpa_chart(fig, data, tutGrpName):
+    """4. Average CGPA per Team"""
+    avg_cgpas = data['avg_cgpas']
+    ax = fig.add_subplot()
+    ax.bar(data['team_ids'], avg_cgpas, color='#9b59b6', edgecolor='black', linewidth=1.2)
+    ax.set_title(f"Average CGPA per Team in {tutGrpName}", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Teams")
+    ax.set_ylabel("Average CGPA")
+    ax.set_ylim(0, 5)
+    total_avg = sum(avg_cgpas)
+    overall_avg = total_avg / len(avg_cgpas) if avg_cgpas else 0
+    ax.axhline(y=overall_avg, color='red', linestyle='--', linewidth=2, label=f'Overall Avg: {overall_avg:.2f}')
+    ax.legend()
+    fig.tight_layout()
+
+def draw_school_chart(fig, data, tutGrpName):
+    """5. School Diversity (Stacked Bar Chart)"""
+    team_ids = data['team_ids']
+    all_schools = data['all_schools']
+    # Define colors
+    colors = [ 
+        "#1f77b4", "#ff7f0e", "#2ca02c", "#9467bd", "#8c564b", 
+        "#e377c2", "#7f7f7f", "#bcbd22", "#17becf", "#3498db",
+        "#d62728", "#8dd3c7", "#fdb462", "#b3de69", "#fb8072"
+    ]
+
+    # Map each school to a color by index
+    school_colors = {}
+    for i, school in enumerate(all_schools):
+        school_colors[school] = colors[i % len(colors)]
+
+    ax = fig.add_subplot()
+
+    # Stack raw counts instead of percentages
+    bottom = [0] * len(team_ids)
+    for school in all_schools:
+        # Use actual student counts
+        values = data['school_counts'][school]
+        ax.bar(team_ids, values, bottom=bottom, 
+               color=school_colors[school], label=school)
+        # Update bottom for stacking
+        for j in range(len(bottom)):
+            bottom[j] += values[j]
+
+    ax.set_xlabel("Teams")
+    ax.set_ylabel("Total Number of Students")
+    ax.set_title(f"School Diversity (Team Size & Composition) - {tutGrpName}")
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    fig.tight_layout()
+
+# (file suffix, figure size, draw function) of each tutorial chart, in display order
+TUTORIAL_CHARTS = [
+    ('gender', (10, 5), draw_gender_chart),
+    ('cgpa_std', (10, 5), draw_cgpa_std_chart),
+    ('avg_cgpa', (10, 5), draw_avg_cgpa_chart),
+    ('schools', (12, 6), draw_school_chart),
+]
+
+# Part of every tutorial's chart hash; bump it when a chart's look changes
+CHART_VERSION = 1
+
+def visualize_tutorial_group(tutGrp, tutGrpName, data=None):
+    """Create visualizations: Gender, CGPA Diversity, School Diversity (Stacked), and Average CGPA"""
+    if data is None:
+        data = tutorial_chart_data(team_table({tutGrpName: tutGrp}), 0)
+    for _, size, draw in TUTORIAL_CHARTS:
+        fig = plt.figure(figsize=size)
+        draw(fig, data, tutGrpName)
+        plt.show()
+
+def tutorial_chart_hash(tutGrpName, tutGrp):
+    """Hash of a tutorial's team composition: same hash, same charts"""
+    teams = [[(str(s['id']), s['gender'], s['school'], repr(float(s['cgpa']))) for s in team] for team in tutGrp]
+    payload = json.dumps([CHART_VERSION, str(tutGrpName), teams], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def chart_filename(tutGrpName, chart):
+    return re.sub(r'[^\w.-]', '_', str(tutGrpName)) + f"_{chart}.png"
+
+def _chart_figures():
+    # Plain Agg figures, not pyplot ones: nothing is shown and nothing needs closing
+    return [Figure(figsize=size) for _, size, _ in TUTORIAL_CHARTS]
+
+def _render_png_chunk(items, out_dir):
+    """Worker: draw each (tutorial name, chart data) on one reused set of figures and save PNGs"""
+    figures = _chart_figures()
+    for tut_name, data in items:
+        for fig, (chart, _, draw) in zip(figures, TUTORIAL_CHARTS):
+            fig.clear()
+            draw(fig, data, tut_name)
+            fig.savefig(os.path.join(out_dir, chart_filename(tut_name, chart)))
+    return len(items)
+
+def render_tutorials(tutorial_teams, out_dir='charts', fmt='png', workers=1, table=None):
+    """Write every tutorial's charts to files with Agg: PNGs, or one multipage PDF
+
+    Tutorials whose team composition hashes the same as on the last render (kept in
+    out_dir/manifest.json) are skipped. Returns (rendered, skipped).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {}
+    previous = manifest.get(fmt, {})
+    hashes = {tut: tutorial_chart_hash(tut, teams) for tut, teams in tutorial_teams.items()}
+    if table is None:
+        table = team_table(tutorial_teams)
+
+    if fmt == 'pdf':
+        path = os.path.join(out_dir, 'tutorial_charts.pdf')
+        if previous == hashes and os.path.exists(path):
+            return 0, len(hashes)
+        # A single PDF is written by a single process, so its pages are drawn here
+        figures = _chart_figures()
+        with PdfPages(path) as pdf:
+            for t, tut_name in enumerate(tutorial_teams):
+                data = tutorial_chart_data(table, t)
+                for fig, (_, _, draw) in zip(figures, TUTORIAL_CHARTS):
+                    fig.clear()
+                    draw(fig, data, tut_name)
+                    pdf.savefig(fig)
+        rendered = len(hashes)
+    else:
+        stale = [tut for tut in tutorial_teams
+                 if previous.get(tut) != hashes[tut] or
+                 not all(os.path.exists(os.path.join(out_dir, chart_filename(tut, chart))) for chart, _, _ in TUTORIAL_CHARTS)]
+        index = {tut: t for t, tut in enumerate(table['tutorials'])}
+        items = [(tut, tutorial_chart_data(table, index[tut])) for tut in stale]
+        if workers > 1 and len(items) > 1:
+            chunks = [items[k::workers] for k in range(min(workers, len(items)))]
+            with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+                list(pool.map(_render_png_chunk, chunks, itertools.repeat(out_dir)))
+        elif items:
+            _render_png_chunk(items, out_dir)
+        rendered = len(stale)
+
+    manifest[fmt] = hashes
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as file:
+        json.dump(manifest, file)
+    os.replace(tmp, manifest_path)
+    return rendered, len(hashes) - rendered
+
+from IPython.display import display
+import ipywidgets as widgets
+team_size_widget = widgets.IntText(
+    value=5,
+    description='Team Size:',
+    style={'description_width': 'initial'}
+)
+
+workers_widget = widgets.IntText(
+    value=1,
+    description='Workers:',
+    style={'description_width': 'initial'}
+)
+
+refine_widget = widgets.FloatText(
+    value=0.0,
+    description='Refine (s):',
+    style={'description_width': 'initial'}
+)
+
+engine_widget = widgets.Dropdown(
+    options=['greedy', 'flow'],
+    value='greedy',
+    description='Engine:',
+    style={'description_width': 'initial'}
+)
+
+# Allocations tried per tutorial; the best-scoring one is kept
+starts_widget = widgets.IntText(
+    value=1,
+    description='Starts:',
+    style={'description_width': 'initial'}
+)
+
+# Blank seed (the default) means a fresh random allocation every click, with no
+# caching; enter a seed to get reproducible teams and reuse unchanged tutorials
+seed_widget = widgets.Text(
+    value='',
+    placeholder='random',
+    description='Seed:',
+    style={'description_width': 'initial'}
+)
+
+# 'inline' shows every chart in the notebook; 'png'/'pdf' write them to charts/ instead
+charts_widget = widgets.Dropdown(
+    options=['inline', 'png', 'pdf'],
+    value='inline',
+    description='Charts:',
+    style={'description_width': 'initial'}
+)
+
+run_button = widgets.Button(
+    description='Generate Teams',
+    button_style='success',
+    icon='users'
+)
+
+output = widgets.Output()
+
+# --- Callback function ---
+def run_allocation(b):
+    with output:
+        output.clear_output()
+        team_size = team_size_widget.value
+        print(f"Starting team allocation with team size {team_size}...\n")
+        
+        # Load students
+        try:
+            all_students = read_file('records.csv')
+        except FileNotFoundError:
+            print("Error: 'records.csv' not found.")
+            return
+        
+        tutorials = group_by_tutorial(all_students)
+        
+        # Team formation, reusing cached teams for tutorials that haven't changed
+        seed = seed_widget.value.strip() or None
+        tutorial_teams = allocate_tutorials(tutorials, team_size, workers_widget.value,
+                                            refine_widget.value, engine_widget.value,
+                                            seed, ResultCache(ALLOCATION_CACHE_DIR), starts_widget.value)
+        
+        # Summary + CSV, with every team's stats computed once for the summary and charts
+        table = team_table(tutorial_teams)
+        print_summary(tutorial_teams, table)
+        write_csv(all_students, 'FCS1_Team_Allocation.csv')
+        print("\nDONE! Check CSV: 'FCS1_Team_Allocation.csv'\n")
+        
+        # Visualizations
+        if charts_widget.value == 'inline':
+            for t, (tut_name, teams) in enumerate(tutorial_teams.items()):
+                print(f"Generating visualizations for {tut_name}...")
+                visualize_tutorial_group(teams, tut_name, tutorial_chart_data(table, t))
+        else:
+            rendered, skipped = render_tutorials(tutorial_teams, 'charts', charts_widget.value, workers_widget.value, table)
+            print(f"Charts written to 'charts/' ({rendered} tutorials drawn, {skipped} unchanged)")
+
+# Link button to callback
+run_button.on_click(run_allocation)
+
+# Display widgets (only when run as the notebook, not when imported)
+if __name__ == "__main__":
+    display(widgets.VBox([
+        widgets.HBox([team_size_widget, workers_widget, refine_widget, engine_widget, starts_widget, seed_widget, charts_widget, run_button]),
+        output
+    ]))
+
@@ -1,241 +1,329 @@
-import random
-import csv
-
-STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
-
-def read_file(filename):
-    students = []
-    with open(filename, 'r', newline='') as file:
-        reader = csv.DictReader(file, fieldnames=['tutorial', 'id', 'name', 'school', 'gender', 'cgpa'])
-        next(reader)
-        
-        for row in reader:
-            if not any(row.values()):
-                continue
-            try:
-                row['cgpa'] = float(row['cgpa'])
-                row['team'] = 0
-                students.append(row)
-            except ValueError:
-                print(f"Warning: Invalid CGPA for ID {row['id']}")
-                continue
-    
-    print(f"Loaded {len(students)} students")
-    return students
-
-def calculate_ratio(students, team_size):
-    male, female = count_gender(students)
-    stem, nonstem = count_stem(students)
-    total = male + female
-    
-    if total == 0:
-        default_max = max(1, (team_size + 1) // 2)
-        return {'male_max': default_max, 'female_max': default_max,
-                'stem_max': default_max, 'nonstem_max': default_max}
-    
-    tolerance = 0.1
-    male_max = int(team_size * min(male / total + tolerance, 1) + 0.5)
-    female_max = int(team_size * min(female / total + tolerance, 1) + 0.5)
-    stem_max = int(team_size * min(stem / total + tolerance, 1) + 0.5)
-    nonstem_max = int(team_size * min(nonstem / total + tolerance, 1) + 0.5)
-    
-    return {'male_max': max(1, male_max), 'female_max': max(1, female_max),
-            'stem_max': max(1, stem_max), 'nonstem_max': max(1, nonstem_max)}
-
-def count_gender(team):
-    male = female = 0
-    for student in team:
-        if student['gender'].upper() in ['M', 'MALE']:
-            male += 1
-        elif student['gender'].upper() in ['F', 'FEMALE']:
-            female += 1
-    return male, female
-
-def count_stem(team):
-    stem = nonstem = 0
-    for student in team:
-        if student['school'] in STEM_SCHOOLS:
-            stem += 1
-        elif student['school']:
-            nonstem += 1
-    return stem, nonstem
-
-def check_balanced(team, student, team_size, ratio):
-    if len(team) >= team_size:
-        return False
-    temp_team = team + [student]
-    male, female = count_gender(temp_team)
-    stem, nonstem = count_stem(temp_team)
-    return (male <= ratio['male_max'] and female <= ratio['female_max'] and
-            stem <= ratio['stem_max'] and nonstem <= ratio['nonstem_max'])
-
-def group_by_tutorial(students):
-    tutorials = {}
-    for student in students:
-        tut = student['tutorial']
-        if tut not in tutorials:
-            tutorials[tut] = []
-        tutorials[tut].append(student)
-    print(f"Found {len(tutorials)} tutorial groups")
-    return tutorials
-
-def sort_by_cgpa(students):
-    n = len(students)
-    for i in range(n):
-        max_idx = i
-        for j in range(i + 1, n):
-            if students[j]['cgpa'] > students[max_idx]['cgpa']:
-                max_idx = j
-        students[i], students[max_idx] = students[max_idx], students[i]
-    return students
-
-def form_teams(students, team_size):
-    if len(students) == 0:
-        return []
-    
-    ratio = calculate_ratio(students, team_size)
-    total = len(students)
-    num_teams = (total + team_size - 1) // team_size
-    
-    base_size = total // num_teams
-    extra = total % num_teams
-    team_sizes = [base_size + 1 if i < extra else base_size for i in range(num_teams)]
-    
-    teams = [[] for _ in range(num_teams)]
-    placed_ids = {}
-    
-    stem, nonstem, males, females = [], [], [], []
-    for s in students:
-        if s['school'] in STEM_SCHOOLS:
-            stem.append(s)
-        elif s['school']:
-            nonstem.append(s)
-        
-        if s['gender'].upper() in ['M', 'MALE']:
-            males.append(s)
-        elif s['gender'].upper() in ['F', 'FEMALE']:
-            females.append(s)
-    
-    stem = sort_by_cgpa(stem)
-    nonstem = sort_by_cgpa(nonstem)
-    males = sort_by_cgpa(males)
-    females = sort_by_cgpa(females)
-    
-    stem_minority, stem_majority = (stem, nonstem) if len(stem) <= len(nonstem) else (nonstem, stem)
-    gender_minority, gender_majority = (males, females) if len(males) <= len(females) else (females, males)
-    
-    random.shuffle(stem_majority)
-    random.shuffle(gender_majority)
-    
-    for i in range(len(stem_minority)):
-        student = stem_minority[i]
-        if student['id'] not in placed_ids:
-            teams[i % num_teams].append(student)
-            placed_ids[student['id']] = True
-
-    for i in range(len(gender_minority)):
-        student = gender_minority[i]
-        if student['id'] not in placed_ids:
-            teams[i % num_teams].append(student)
-            placed_ids[student['id']] = True
-    
-    current_team = 0
-    for student in gender_majority:
-        if student['id'] in placed_ids:
-            continue
-        
-        placed = False
-        for offset in range(num_teams):
-            idx = (current_team + offset) % num_teams
-            if len(teams[idx]) < team_sizes[idx] and \
-               check_balanced(teams[idx], student, team_sizes[idx], ratio):
-                teams[idx].append(student)
-                placed_ids[student['id']] = True
-                placed = True
-                current_team = (idx + 1) % num_teams
-                break
-        
-        if not placed:
-            best_team = 0
-            max_space = team_sizes[0] - len(teams[0])
-            for t in range(1, num_teams):
-                space = team_sizes[t] - len(teams[t])
-                if space > max_space:
-                    max_space = space
-                    best_team = t
-            teams[best_team].append(student)
-            placed_ids[student['id']] = True
-            current_team = (best_team + 1) % num_teams
-    
-    for student in stem_majority:
-        if student['id'] in placed_ids:
-            continue
-        
-        placed = False
-        for offset in range(num_teams):
-            idx = (current_team + offset) % num_teams
-            if len(teams[idx]) < team_sizes[idx] and \
-               check_balanced(teams[idx], student, team_sizes[idx], ratio):
-                teams[idx].append(student)
-                placed_ids[student['id']] = True
-                placed = True
-                current_team = (idx + 1) % num_teams
-                break
-        
-        if not placed:
-            best_team = 0
-            max_space = team_sizes[0] - len(teams[0])
-            for t in range(1, num_teams):
-                space = team_sizes[t] - len(teams[t])
-                if space > max_space:
-                    max_space = space
-                    best_team = t
-            teams[best_team].append(student)
-            placed_ids[student['id']] = True
-            current_team = (best_team + 1) % num_teams
-    
-    return teams
-
-def write_csv(all_students, filename):
-    groups = {}
-    for student in all_students:
-        key = (student['tutorial'], student['team'])
-        if key not in groups:
-            groups[key] = []
-        groups[key].append(student)
-    
-    keys_list = list(groups.keys())
-    n = len(keys_list)
-    for i in range(n):
-        for j in range(i + 1, n):
-            if keys_list[i] > keys_list[j]:
-                keys_list[i], keys_list[j] = keys_list[j], keys_list[i]
-    
-    with open(filename, 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=['tutorial', 'id', 'school', 'name', 'gender', 'cgpa', 'team'])
-        writer.writeheader()
-        for key in keys_list:
-            writer.writerows(groups[key])
-    print(f"Saved to {filename}")
-
-def main():
-    print("Team Allocation (STEM/NON-STEM):")
-    team_size = 5
-    print(f"Team Size: {team_size}")
-    
-    all_students = read_file('records.csv')
-    tutorials = group_by_tutorial(all_students)
-    
-    team_number = 1
-    for tut_students in tutorials.values():
-        teams = form_teams(tut_students, team_size)
-        for team in teams:
-            for student in team:
-                student['team'] = team_number
-            team_number += 1
-    
-    write_csv(all_students, 'FCS1_Team2_Joshua.csv')
-    print("DONE! Check the output CSV file.")
-
-if __name__ == "__main__":
+import random
+import csv
+import os
+import bisect
+import heapq
+import functools
+from local_search import refine_teams
+from flow_engine import flow_form_teams
+from allocation_cache import ResultCache, DEFAULT_DIR
+import allocation_driver
+from allocation_driver import output_row, stream_teams, count_tutorials
+
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+FIELDS = ['tutorial', 'id', 'name', 'school', 'gender', 'cgpa']
+OUTPUT_FIELDS = ['tutorial', 'id', 'school', 'name', 'gender', 'cgpa', 'team']
+WRITE_BUFFER = 1 << 20
+# Keys don't say which script's form_teams made a result, so each script caches in its own directory
+ALLOCATION_CACHE_DIR = os.path.join(DEFAULT_DIR, 'basic')
+
+def read_file(filename):
+    with open(filename, 'r', newline='') as file:
+        reader = csv.DictReader(file, fieldnames=FIELDS)
+        next(reader)
+        students = list(parse_students(reader))
+    
+    print(f"Loaded {len(students)} students")
+    return students
+
+def parse_students(reader):
+    for row in reader:
+        if not any(row.values()):
+            continue
+        try:
+            row['cgpa'] = float(row['cgpa'])
+            row['team'] = 0
+            yield row
+        except ValueError:
+            print(f"Warning: Invalid CGPA for ID {row['id']}")
+            continue
+
+def calculate_ratio(students, team_size):
+    male, female = count_gender(students)
+    stem, nonstem = count_stem(students)
+    total = male + female
+    
+    if total == 0:
+        default_max = max(1, (team_size + 1) // 2)
+        return {'male_max': default_max, 'female_max': default_max,
+                'stem_max': default_max, 'nonstem_max': default_max}
+    
+    tolerance = 0.1
+    male_max = int(team_size * min(male / total + tolerance, 1) + 0.5)
+    female_max = int(team_size * min(female / total + tolerance, 1) + 0.5)
+    stem_max = int(team_size * min(stem / total + tolerance, 1) + 0.5)
+    nonstem_max = int(team_size * min(nonstem / total + tolerance, 1) + 0.5)
+    
+    return {'male_max': max(1, male_max), 'female_max': max(1, female_max),
+            'stem_max': max(1, stem_max), 'nonstem_max': max(1, nonstem_max)}
+
+def count_gender(team):
+    male = female = 0
+    for student in team:
+        if student['gender'].upper() in ['M', 'MALE']:
+            male += 1
+        elif student['gender'].upper() in ['F', 'FEMALE']:
+            female += 1
+    return male, female
+
+def count_stem(team):
+    stem = nonstem = 0
+    for student in team:
+        if student['school'] in STEM_SCHOOLS:
+            stem += 1
+        elif student['school']:
+            nonstem += 1
+    return stem, nonstem
+
+def check_balanced(team, student, team_size, ratio):
+    if len(team) >= team_size:
+        return False
+    temp_team = team + [student]
+    male, female = count_gender(temp_team)
+    stem, nonstem = count_stem(temp_team)
+    return (male <= ratio['male_max'] and female <= ratio['female_max'] and
+            stem <= ratio['stem_max'] and nonstem <= ratio['nonstem_max'])
+
+class OpenTeams:
+    """Remaining space per team, with a sorted index of teams that still have room
+    (for the round-robin probe) and a lazily updated max-heap of space (for the fallback)"""
+    def __init__(self, team_sizes):
+        self.space = list(team_sizes)
+        self.open = [t for t, size in enumerate(team_sizes) if size > 0]
+        self.heap = [(-size, t) for t, size in enumerate(team_sizes)]
+        heapq.heapify(self.heap)
+    
+    def take(self, team):
+        self.space[team] -= 1
+        if self.space[team] == 0:
+            del self.open[bisect.bisect_left(self.open, team)]
+    
+    def probe(self, start):
+        """Open teams from start onwards, wrapping around"""
+        first = bisect.bisect_left(self.open, start)
+        for k in range(len(self.open)):
+            yield self.open[(first + k) % len(self.open)]
+    
+    def roomiest(self):
+        # Space only shrinks, so a heap key can only overstate it; re-key stale tops
+        # until the top is current. Ties go to the lowest index.
+        while -self.heap[0][0] != self.space[self.heap[0][1]]:
+            team = self.heap[0][1]
+            heapq.heapreplace(self.heap, (-self.space[team], team))
+        return self.heap[0][1]
+
+def group_by_tutorial(students):
+    tutorials = {}
+    for student in students:
+        tut = student['tutorial']
+        if tut not in tutorials:
+            tutorials[tut] = []
+        tutorials[tut].append(student)
+    print(f"Found {len(tutorials)} tutorial groups")
+    return tutorials
+
+def sort_by_cgpa(students):
+    # Stable O(n log n) sort, highest CGPA first, ties broken by student ID
+    students.sort(key=lambda s: (-s['cgpa'], s['id']))
+    return students
+
+def partition_students(students):
+    """Split a tutorial into STEM/non-STEM and male/female buckets in one pass, each sorted by CGPA"""
+    buckets = {'stem': [], 'nonstem': [], 'male': [], 'female': []}
+    for s in students:
+        if s['school'] in STEM_SCHOOLS:
+            buckets['stem'].append(s)
+        elif s['school']:
+            buckets['nonstem'].append(s)
+
+        gender = s['gender'].upper()
+        if gender in ['M', 'MALE']:
+            buckets['male'].append(s)
+        elif gender in ['F', 'FEMALE']:
+            buckets['female'].append(s)
+
+    for bucket in buckets.values():
+        sort_by_cgpa(bucket)
+    return buckets
+
+def form_teams(students, team_size, refine_time=0.0, engine='greedy', seed=None, buckets=None, stats=None):
+    """Split one tutorial into teams of about team_size
+
+    buckets can be a partition_students() result computed earlier (it is copied, not
+    shuffled in place). If stats is a dict, stats['fallback'] counts students that
+    fitted no team and went to the one with the most space.
+    """
+    if len(students) == 0:
+        return []
+    
+    # A seed gives the same teams for the same roster every time
+    rng = random.Random(seed) if seed is not None else random
+    
+    ratio = calculate_ratio(students, team_size)
+    total = len(students)
+    num_teams = (total + team_size - 1) // team_size
+    
+    base_size = total // num_teams
+    extra = total % num_teams
+    team_sizes = [base_size + 1 if i < extra else base_size for i in range(num_teams)]
+    
+    if engine == 'flow':
+        # Exact min-cost-flow allocation instead of the greedy passes below
+        teams = flow_form_teams(students, team_sizes, ratio, school_limit=(team_size // 2) + 1)
+        refine_teams(teams, ratio, refine_time, school_max=(team_size // 2) + 1, rng=rng)
+        return teams
+    if engine != 'greedy':
+        raise ValueError(f"Unknown allocation engine '{engine}'")
+    
+    teams = [[] for _ in range(num_teams)]
+    open_teams = OpenTeams(team_sizes)
+    placed_ids = {}
+    
+    def place(team, student):
+        teams[team].append(student)
+        open_teams.take(team)
+        placed_ids[student['id']] = True
+    
+    if buckets is None:
+        buckets = partition_students(students)
+    buckets = {key: list(bucket) for key, bucket in buckets.items()}
+    stem, nonstem = buckets['stem'], buckets['nonstem']
+    males, females = buckets['male'], buckets['female']
+    
+    stem_minority, stem_majority = (stem, nonstem) if len(stem) <= len(nonstem) else (nonstem, stem)
+    gender_minority, gender_majority = (males, females) if len(males) <= len(females) else (females, males)
+    
+    rng.shuffle(stem_majority)
+    rng.shuffle(gender_majority)
+    
+    for i in range(len(stem_minority)):
+        student = stem_minority[i]
+        if student['id'] not in placed_ids:
+            place(i % num_teams, student)
+
+    for i in range(len(gender_minority)):
+        student = gender_minority[i]
+        if student['id'] not in placed_ids:
+            place(i % num_teams, student)
+    
+    current_team = 0
+    for student in gender_majority:
+        if student['id'] in placed_ids:
+            continue
+        
+        placed = False
+        for idx in open_teams.probe(current_team):
+            if check_balanced(teams[idx], student, team_sizes[idx], ratio):
+                place(idx, student)
+                placed = True
+                current_team = (idx + 1) % num_teams
+                break
+        
+        if not placed:
+            if stats is not None:
+                stats['fallback'] = stats.get('fallback', 0) + 1
+            best_team = open_teams.roomiest()
+            place(best_team, student)
+            current_team = (best_team + 1) % num_teams
+    
+    for student in stem_majority:
+        if student['id'] in placed_ids:
+            continue
+        
+        placed = False
+        for idx in open_teams.probe(current_team):
+            if check_balanced(teams[idx], student, team_sizes[idx], ratio):
+                place(idx, student)
+                placed = True
+                current_team = (idx + 1) % num_teams
+                break
+        
+        if not placed:
+            if stats is not None:
+                stats['fallback'] = stats.get('fallback', 0) + 1
+            best_team = open_teams.roomiest()
+            place(best_team, student)
+            current_team = (best_team + 1) % num_teams
+    
+    # Optional swap-based clean-up of whatever the greedy pass left unbalanced,
+    # using the validator's school limit
+    refine_teams(teams, ratio, refine_time, school_max=(team_size // 2) + 1, rng=rng)
+    return teams
+
+# Scoring, multi-start, the process pool, caching and team numbering are shared
+# with the other script; only this script's form_teams is plugged in
+allocate_tutorials = functools.partial(allocation_driver.allocate_tutorials, form_teams)
+
+def sweep_team_sizes(filename, sizes=range(4, 11), workers=1, refine_time=0.0, engine='greedy', seed=None):
+    """Allocate the roster once per team size and print a table of balance metrics
+
+    The roster is read, grouped and partitioned once here; the sizes are run by
+    allocation_driver.sweep_team_sizes.
+    """
+    students = read_file(filename)
+    tutorials = group_by_tutorial(students)
+    buckets = {tut: partition_students(tut_students) for tut, tut_students in tutorials.items()}
+    return allocation_driver.sweep_team_sizes(form_teams, calculate_ratio, tutorials, buckets, sizes, workers,
+                                              refine_time, engine, seed)
+
+def write_csv(all_students, filename):
+    # Bucket by (tutorial, team) in one pass; only the bucket keys get sorted
+    groups = {}
+    for student in all_students:
+        key = (student['tutorial'], student['team'])
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(output_row(student))
+    
+    with open(filename, 'w', newline='', buffering=WRITE_BUFFER) as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_FIELDS)
+        for key in sorted(groups):
+            writer.writerows(groups[key])
+    print(f"Saved to {filename}")
+
+def stream_allocation(in_filename, out_filename, team_size, refine_time=0.0, engine='greedy', seed=None):
+    """Allocate a roster already sorted by tutorial, holding only one tutorial in memory.
+
+    See allocation_driver.stream_teams: tutorials are written in input order. As in
+    allocate_tutorials, refine_time is the total budget, split evenly across tutorials.
+    """
+    tutorial_refine = refine_time / max(count_tutorials(in_filename), 1) if refine_time > 0 else 0.0
+    with open(in_filename, 'r', newline='') as infile, \
+         open(out_filename, 'w', newline='', buffering=WRITE_BUFFER) as outfile:
+        reader = csv.DictReader(infile, fieldnames=FIELDS)
+        next(reader)
+        writer = csv.writer(outfile)
+        writer.writerow(OUTPUT_FIELDS)
+        total, tutorials = stream_teams(form_teams, parse_students(reader), writer, team_size,
+                                        tutorial_refine, engine, seed)
+    
+    print(f"Streamed {total} students in {tutorials} tutorial groups to {out_filename}")
+
+def main(team_size=5, workers=1, refine_time=0.0, engine='greedy', stream=False, seed=None, sweep=None,
+         starts=1):
+    if sweep:
+        # Compare several team sizes instead of writing one allocation
+        sweep_team_sizes('records.csv', sweep, workers, refine_time, engine, seed)
+        return
+    
+    print("Team Allocation (STEM/NON-STEM):")
+    print(f"Team Size: {team_size}")
+    
+    if stream:
+        # records.csv is sorted by tutorial, so it can be allocated one tutorial at a time
+        stream_allocation('records.csv', 'FCS1_Team2_Joshua.csv', team_size, refine_time, engine, seed)
+        print("DONE! Check the output CSV file.")
+        return
+    
+    all_students = read_file('records.csv')
+    tutorials = group_by_tutorial(all_students)
+    # Seeded runs are reproducible, so unchanged tutorials come from the cache
+    cache = ResultCache(ALLOCATION_CACHE_DIR) if seed is not None else None
+    allocate_tutorials(tutorials, team_size, workers, refine_time, engine, seed, cache, starts)
+    
+    write_csv(all_students, 'FCS1_Team2_Joshua.csv')
+    print("DONE! Check the output CSV file.")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,17 +1,24 @@
-# Robust full cell: normalise column names, compute metrics, and plot 3 graphs
+# Robust full cell: load the allocation, compute metrics, and plot 3 graphs
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from roster import Roster
+from team_stats import roster_table
 
-# Load your dataset
-df = pd.read_csv("FCS1_Team2_Joshua.csv")
+# Load your dataset through the roster cache, so an unchanged file is not parsed again
+roster = Roster.load("FCS1_Team2_Joshua.csv")
 
-# --- 0. Normalize column names so code is case-insensitive ---
-df.columns = df.columns.str.strip().str.lower()
+# Per-team stats from the same table the summary and charts use, one row per team
+table = roster_table(roster)
+teams = pd.DataFrame({
+    'tutorial': [table['tutorials'][t] for t in table['tutorial']],
+    'cgpa': table['cgpa_mean'],
+    'prop_female': table['female'] / table['size'],
+    'num_schools': (table['schools'] > 0).sum(axis=1),
+})
 
 # --- 1. CGPA balance within tutorials ---
-team_means = df.groupby(['tutorial', 'team'])['cgpa'].mean().reset_index()
-cgpa_balance = team_means.groupby('tutorial')['cgpa'].std().reset_index(name='std_cgpa_balance')
+cgpa_balance = teams.groupby('tutorial')['cgpa'].std().reset_index(name='std_cgpa_balance')
 
 plt.figure(figsize=(12,5))
 sns.barplot(data=cgpa_balance, x='tutorial', y='std_cgpa_balance', color='skyblue')
@@ -23,13 +30,7 @@ plt.tight_layout()
 plt.show()
 
 # --- 2. Gender balance within tutorials ---
-gender_props = (
-    df.assign(is_female=df['gender'].str.lower().eq('female').astype(int))
-      .groupby(['tutorial','team'])['is_female']
-      .mean()
-      .reset_index(name='prop_female')
-)
-gender_balance = gender_props.groupby('tutorial')['prop_female'].std().reset_index(name='std_gender_balance')
+gender_balance = teams.groupby('tutorial')['prop_female'].std().reset_index(name='std_gender_balance')
 
 plt.figure(figsize=(12,5))
 sns.barplot(data=gender_balance, x='tutorial', y='std_gender_balance', color='lightgreen')
@@ -41,16 +42,9 @@ plt.tight_layout()
 plt.show()
 
 # --- 3. School diversity within tutorials (FIXED - BETTER METRIC) ---
-# Count unique schools per team
-school_diversity = (
-    df.groupby(['tutorial', 'team'])['school']
-    .nunique()
-    .reset_index(name='num_schools')
-)
-
 # Average number of different schools per team in each tutorial
 school_summary = (
-    school_diversity
+    teams
     .groupby('tutorial')['num_schools']
     .mean()
     .reset_index(name='avg_schools_per_team')
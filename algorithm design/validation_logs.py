@@ -0,0 +1,350 @@
+"""
+Structured validation run logs with a SQLite index.
+
+Every run is written next to the text log as Logs/T<size>/T<size>_Logs_<timestamp>.jsonl.gz:
+one JSON object per line, first a header (file, settings, score, counts), then
+one line per team with its metrics, then one line per issue holding the raw
+(severity, category, template, args) tuple.
+
+Each run is also added to Logs/validation_index.sqlite: a row in runs (indexed on
+team size, strictness and time), its balance figures in run_metrics and its issue
+messages in issues, so trends come from one query instead of opening logs:
+
+    python validation_logs.py trend --team-size 5 --strictness NIGHTMARE
+
+Older runs only exist as the text logs (Logs/T*/T*_Logs_*.txt). `import` backfills
+them into the same tables, and skips files it has already loaded unless their
+mtime changed:
+
+    python validation_logs.py import
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from validator_engine import SEVERITIES
+
+LOG_DIR = 'Logs'
+INDEX_FILE = os.path.join(LOG_DIR, 'validation_index.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    input_file TEXT NOT NULL,
+    team_size INTEGER NOT NULL,
+    strictness TEXT NOT NULL,
+    score REAL,
+    grade TEXT,
+    students INTEGER,
+    teams INTEGER,
+    issues INTEGER,
+    critical INTEGER,
+    warning INTEGER,
+    info INTEGER,
+    log_path TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_settings ON runs (team_size, strictness, timestamp);
+CREATE INDEX IF NOT EXISTS runs_by_file ON runs (input_file, timestamp);
+
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id),
+    expected_size INTEGER,
+    gender_balanced INTEGER,
+    gender_imbalanced INTEGER,
+    school_balanced INTEGER,
+    school_imbalanced INTEGER,
+    gender_rate REAL,
+    school_rate REAL,
+    cgpa_rate REAL,
+    penalty REAL,
+    avg_team_mean REAL,
+    avg_team_std REAL
+);
+
+CREATE TABLE IF NOT EXISTS issues (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_by_run ON issues (run_id, severity);
+CREATE INDEX IF NOT EXISTS issues_by_category ON issues (category, severity);
+
+-- Text logs already imported, so a re-import only reads new or modified files
+CREATE TABLE IF NOT EXISTS imported_logs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs (id)
+);
+"""
+
+# Text log lines the importer picks values out of: (pattern, field names)
+HEADER_PATTERNS = [
+    (re.compile(r"^Timestamp:\s*(.+)$"), ('timestamp',)),
+    (re.compile(r"^CSV File:\s*(.+)$"), ('input_file',)),
+    (re.compile(r"^Team Size:\s*(\d+)"), ('team_size',)),
+    (re.compile(r"^Strictness:\s*(\w+)"), ('strictness',)),
+    (re.compile(r"^Score:\s*([\d.]+)% \| Grade: (.+)$"), ('score', 'grade')),
+    (re.compile(r"^Issues:\s*(\d+) \(\D*(\d+)/\D*(\d+)/\D*(\d+)\)"), ('issues', 'critical', 'warning', 'info')),
+]
+SUMMARY_PATTERNS = [
+    (re.compile(r"^Total Students:\s*(\d+)"), ('students',)),
+    (re.compile(r"^Total Teams:\s*(\d+)"), ('teams',)),
+    (re.compile(r"^Expected Size:\s*(\d+)"), ('expected_size',)),
+    (re.compile(r"Score Penalty: -([\d.]+)%"), ('penalty',)),
+    (re.compile(r"Average team mean:\s*([\d.]+)"), ('avg_team_mean',)),
+    (re.compile(r"Average team std:\s*([\d.]+)"), ('avg_team_std',)),
+    (re.compile(r"^Gender Balance:\s*([\d.]+)%"), ('gender_rate',)),
+    (re.compile(r"^School Diversity:\s*([\d.]+)%"), ('school_rate',)),
+    (re.compile(r"^CGPA Distribution:\s*([\d.]+)%"), ('cgpa_rate',)),
+]
+LINE_PATTERNS = HEADER_PATTERNS + SUMMARY_PATTERNS
+BALANCE_LINE = re.compile(r"(Imbalanced|Balanced):\s*(\d+) teams")
+SEVERITY_LINE = re.compile(r"(CRITICAL|WARNING|INFO) ISSUES \(\d+\):")
+ISSUE_LINE = re.compile(r"^\s*\d+\. \[([^\]]+)\] (.*)$")
+METRIC_COLUMNS = ('expected_size', 'gender_balanced', 'gender_imbalanced', 'school_balanced',
+                  'school_imbalanced', 'gender_rate', 'school_rate', 'cgpa_rate', 'penalty',
+                  'avg_team_mean', 'avg_team_std')
+INT_FIELDS = {'team_size', 'issues', 'critical', 'warning', 'info', 'students', 'teams', 'expected_size'}
+
+
+
+def connect(index_file=INDEX_FILE):
+    folder = os.path.dirname(index_file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(index_file)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def team_records(engine):
+    """One metrics dict per team, from the engine's per-team aggregates"""
+    for tut, teams in engine.team_stats.items():
+        for team, agg in teams.items():
+            yield {
+                'type': 'team', 'tutorial': tut, 'team': team, 'size': agg['size'],
+                'males': agg['males'], 'females': agg['size'] - agg['males'],
+                'schools': agg['schools'],
+                'cgpa_mean': agg.get('mean'), 'cgpa_std': agg.get('std'),
+            }
+
+
+def write_run_log(engine, results, input_file, team_size, timestamp=None, log_dir=LOG_DIR, index_file=None):
+    """Write one validation run as gzip JSON lines and add it to the index; returns the log path"""
+    if timestamp is None:
+        timestamp = datetime.now()
+    if index_file is None:
+        index_file = os.path.join(log_dir, os.path.basename(INDEX_FILE))
+    folder = os.path.join(log_dir, f"T{team_size}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"T{team_size}_Logs_{timestamp:%Y%m%d_%H%M%S}.jsonl.gz")
+
+    store = engine.all_issues
+    counts = engine.issue_counts()
+    metrics = results.get('metrics', {})
+    header = {
+        'type': 'header', 'timestamp': timestamp.isoformat(timespec='seconds'),
+        'input_file': os.path.abspath(input_file), 'team_size': team_size,
+        'strictness': engine.strictness, 'score': results['score'], 'grade': results['grade'],
+        'students': engine.student_count, 'teams': sum(len(teams) for teams in engine.team_stats.values()),
+        'issues': counts, 'metrics': metrics,
+    }
+
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for record in team_records(engine):
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for sev, cat, tmpl, *args in store.issues:
+            record = ['issue', SEVERITIES[sev], store.categories[cat], store.templates[tmpl], args]
+            file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    conn = connect(index_file)
+    with conn:
+        run_id = _insert_run(conn, header['timestamp'], header['input_file'], team_size, engine.strictness,
+                             results['score'], results['grade'], header['students'], header['teams'],
+                             counts['total'], counts['CRITICAL'], counts['WARNING'], counts['INFO'], path)
+        _insert_details(conn, run_id, metrics,
+                        ((store.severity(i), store.category(i), store.message(i)) for i in range(len(store))))
+    conn.close()
+    return path
+
+
+def read_run_log(path):
+    """(header, team records, issue records) of a .jsonl.gz run log"""
+    teams, issues = [], []
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        header = json.loads(next(file))
+        for line in file:
+            record = json.loads(line)
+            if isinstance(record, list):
+                issues.append(record)
+            else:
+                teams.append(record)
+    return header, teams, issues
+
+
+def score_trend(team_size, strictness, input_file=None, index_file=INDEX_FILE):
+    """(timestamp, score, grade, issues, input file) of every indexed run with these settings, oldest first"""
+    query = ("SELECT timestamp, score, grade, issues, input_file FROM runs"
+             " WHERE team_size = ? AND strictness = ?")
+    params = [team_size, strictness]
+    if input_file:
+        query += " AND input_file = ?"
+        params.append(os.path.abspath(input_file))
+    conn = connect(index_file)
+    rows = conn.execute(query + " ORDER BY timestamp", params).fetchall()
+    conn.close()
+    return rows
+
+
+def parse_text_log(file):
+    """Header fields, summary figures and (severity, category, message) issues of a text log
+
+    Reads the file line by line; unknown lines are skipped, so a log cut short or
+    from an older version just yields fewer fields.
+    """
+    fields = {}
+    issues = []
+    balance = None
+    severity = None
+    for line in file:
+        line = line.rstrip("\n")
+        stripped = line.strip()
+
+        if severity is not None:
+            match = ISSUE_LINE.match(line)
+            if match:
+                issues.append((severity, match.group(1), match.group(2)))
+                continue
+        match = SEVERITY_LINE.search(line)
+        if match:
+            severity = match.group(1)
+            continue
+
+        if stripped in ("GENDER BALANCE:", "SCHOOL DIVERSITY:"):
+            balance = 'gender' if stripped.startswith("GENDER") else 'school'
+            continue
+        match = BALANCE_LINE.search(line)
+        if match and balance:
+            fields[f"{balance}_{match.group(1).lower()}"] = int(match.group(2))
+            continue
+
+        for pattern, names in LINE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                for name, value in zip(names, match.groups()):
+                    if name in INT_FIELDS:
+                        value = int(value)
+                    elif name in ('score', 'penalty') or name.endswith(('_rate', '_mean', '_std')):
+                        value = float(value)
+                    fields[name] = value.strip() if isinstance(value, str) else value
+                break
+    if 'timestamp' in fields:
+        fields['timestamp'] = fields['timestamp'].replace(' ', 'T')
+    return fields, issues
+
+
+def _insert_run(conn, *values):
+    """Add one row to runs; values in column order from timestamp to log_path. Returns its id"""
+    cursor = conn.execute(
+        "INSERT INTO runs (timestamp, input_file, team_size, strictness, score, grade, students, teams,"
+        " issues, critical, warning, info, log_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+    return cursor.lastrowid
+
+
+def _insert_details(conn, run_id, metrics, issues):
+    """run_metrics row from a dict of its columns (missing ones stay NULL), and the (severity, category, message) issues"""
+    conn.execute(
+        "INSERT INTO run_metrics (run_id, expected_size, gender_balanced, gender_imbalanced,"
+        " school_balanced, school_imbalanced, gender_rate, school_rate, cgpa_rate, penalty,"
+        " avg_team_mean, avg_team_std) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (run_id,) + tuple(metrics.get(name) for name in METRIC_COLUMNS))
+    conn.executemany("INSERT INTO issues (run_id, severity, category, message) VALUES (?, ?, ?, ?)",
+                     ((run_id,) + tuple(issue) for issue in issues))
+
+
+def _forget_run(conn, run_id):
+    conn.execute("DELETE FROM issues WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM run_metrics WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+
+def import_text_logs(log_dir=LOG_DIR, index_file=None):
+    """Load every Logs/T*/*.txt not seen before (by path and mtime) into the index; returns (imported, skipped)"""
+    if index_file is None:
+        index_file = os.path.join(log_dir, os.path.basename(INDEX_FILE))
+    conn = connect(index_file)
+    seen = {path: (mtime, run_id) for path, mtime, run_id in
+            conn.execute("SELECT path, mtime, run_id FROM imported_logs")}
+    imported = skipped = 0
+
+    for folder in sorted(os.listdir(log_dir)) if os.path.isdir(log_dir) else []:
+        folder_path = os.path.join(log_dir, folder)
+        if not (folder.startswith('T') and os.path.isdir(folder_path)):
+            continue
+        for entry in sorted(os.scandir(folder_path), key=lambda e: e.name):
+            if not entry.name.endswith('.txt'):
+                continue
+            path = os.path.abspath(entry.path)
+            mtime = entry.stat().st_mtime
+            if path in seen and seen[path][0] == mtime:
+                skipped += 1
+                continue
+
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                fields, issues = parse_text_log(file)
+            if 'team_size' not in fields or 'strictness' not in fields:
+                print(f"Skipping {path}: no TEAM VALIDATION LOG header")
+                continue
+
+            # One transaction per file, so an interrupted import never leaves half a run
+            with conn:
+                if path in seen:
+                    _forget_run(conn, seen[path][1])
+                run_id = _insert_run(conn, fields.get('timestamp', ''), fields.get('input_file', ''),
+                                     fields['team_size'], fields['strictness'], fields.get('score'),
+                                     fields.get('grade'), fields.get('students'), fields.get('teams'),
+                                     fields.get('issues'), fields.get('critical'), fields.get('warning'),
+                                     fields.get('info'), path)
+                _insert_details(conn, run_id, dict(fields, penalty=fields.get('penalty', 0.0)), issues)
+                conn.execute("INSERT OR REPLACE INTO imported_logs (path, mtime, run_id) VALUES (?, ?, ?)",
+                             (path, mtime, run_id))
+            imported += 1
+
+    conn.close()
+    return imported, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the validation run index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    trend = sub.add_parser('trend', help="score trend for one team size and strictness")
+    trend.add_argument('--team-size', type=int, required=True)
+    trend.add_argument('--strictness', required=True)
+    trend.add_argument('--file', help="only runs on this input CSV")
+    trend.add_argument('--index', default=INDEX_FILE)
+    backfill = sub.add_parser('import', help="backfill text logs from Logs/T*/ into the index")
+    backfill.add_argument('--logs', default=LOG_DIR)
+    backfill.add_argument('--index', help="index database (default: the one inside --logs)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        imported, skipped = import_text_logs(args.logs, index_file=args.index)
+        print(f"Imported {imported} log(s), skipped {skipped} already in the index")
+        return
+
+    rows = score_trend(args.team_size, args.strictness.upper(), args.file, args.index)
+    print(f"{'Timestamp':<20} {'Score':>7}  {'Grade':<24} {'Issues':>7}  File")
+    for timestamp, score, grade, issues, input_file in rows:
+        score = f"{score:.1f}" if score is not None else "-"
+        print(f"{timestamp:<20} {score:>7}  {grade or '-':<24} {issues if issues is not None else '-':>7}  {input_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,869 @@
+"""
+Headless team allocation validation engine.
+
+All the checks, scoring and text reports behind TeamValidatorGUI, without any
+Tkinter dependency, so allocations can be validated in batch jobs or on a
+server with no display. Run it directly to validate many CSV files in parallel:
+
+    python validator_engine.py Logs/a.csv Logs/b.csv --team-size 5 --strictness ULTRA --workers 4
+
+Each file's result is printed as one line of JSON.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+STRICTNESS_LEVELS = ["NORMAL", "STRICT", "ULTRA", "NIGHTMARE"]
+STEM_SCHOOLS = ["CCDS", "CCEB", "CoE", "EEE", "MAE", "SPMS", "SBS", "MSE", "CEE"]
+# STEM sorting violations kept for the reports; the rest are only counted
+STEM_VIOLATION_SAMPLE = 10
+
+VALIDATION_CACHE_DIR = '.validation_cache'
+# Part of every cache key; bump it whenever a per-tutorial check changes
+CHECKS_VERSION = 2
+
+SEVERITIES = ('CRITICAL', 'WARNING', 'INFO')
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITIES)}
+
+
+class IssueStore:
+    """Validation issues as compact tuples, formatted only when read
+
+    Each issue is one flat tuple (severity code, category code, template code, *args).
+    Categories and message templates are interned, and per-severity and per-category
+    counts are kept up to date as issues are added, so counting never rescans the list.
+    """
+    def __init__(self):
+        self.issues = []
+        self.categories = []
+        self.templates = []
+        self._category_codes = {}
+        self._template_codes = {}
+        self.severity_counts = [0] * len(SEVERITIES)
+        self.category_counts = []
+    
+    def add(self, severity, category, template, args=()):
+        sev = SEVERITY_CODES[severity]
+        cat = self._category_codes.get(category)
+        if cat is None:
+            cat = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+            self.category_counts.append(0)
+        tmpl = self._template_codes.get(template)
+        if tmpl is None:
+            tmpl = self._template_codes[template] = len(self.templates)
+            self.templates.append(template)
+        self.issues.append((sev, cat, tmpl) + args)
+        self.severity_counts[sev] += 1
+        self.category_counts[cat] += 1
+    
+    def __len__(self):
+        return len(self.issues)
+    
+    def count(self, severity):
+        return self.severity_counts[SEVERITY_CODES[severity]]
+    
+    def severity(self, i):
+        return SEVERITIES[self.issues[i][0]]
+    
+    def category(self, i):
+        return self.categories[self.issues[i][1]]
+    
+    def message(self, i):
+        issue = self.issues[i]
+        template = self.templates[issue[2]]
+        return template.format(*issue[3:]) if len(issue) > 3 else template
+    
+    def __getitem__(self, i):
+        return {'severity': self.severity(i), 'category': self.category(i), 'message': self.message(i)}
+    
+    def __iter__(self):
+        for i in range(len(self.issues)):
+            yield self[i]
+    
+    def by_severity(self):
+        """Issue indices bucketed by severity (CRITICAL first), in the order they were found"""
+        groups = [[] for _ in SEVERITIES]
+        for i, issue in enumerate(self.issues):
+            groups[issue[0]].append(i)
+        return groups
+
+
+class ValidationEngine:
+    def __init__(self, strictness="ULTRA", cache=None):
+        self.strictness = strictness
+        # Optional allocation_cache.ResultCache for per-tutorial results between runs
+        self.cache = cache
+        self.reused_tutorials = 0
+        self.all_teams = {}
+        self.students_data = []
+        self.tutorial_demographics = {}
+        self.all_issues = IssueStore()  # Track ALL issues found
+        self.team_stats = {}
+        self.student_count = 0
+        self.stem_order = {'first_non_stem': None, 'count': 0, 'violations': []}
+    
+    def validate_file(self, filename, expected_team_size, keep_rows=True):
+        """Validate one file from a clean state and return validate_csv's results"""
+        self.tutorial_demographics = {}
+        self.all_issues = IssueStore()
+        return self.validate_csv(filename, expected_team_size, keep_rows)
+    
+    def issue_counts(self):
+        counts = {'total': len(self.all_issues)}
+        for severity in SEVERITIES:
+            counts[severity] = self.all_issues.count(severity)
+        return counts
+    
+    def add_issue(self, severity, category, template, *args):
+        """Track all issues found during validation; the message is template.format(*args), built on demand."""
+        self.all_issues.add(severity, category, template, args)
+    
+    def detect_column_mapping(self, header):
+        header_lower = [h.strip().lower() for h in header]
+        mapping = {}
+        
+        for i, col in enumerate(header_lower):
+            if 'tutorial' in col:
+                mapping['tutorial'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if 'student' in col and 'id' in col:
+                mapping['id'] = i
+                break
+            elif col in ['id', 'student_id', 'studentid']:
+                mapping['id'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if col == 'name' or col == 'student name':
+                mapping['name'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if col == 'school' or col == 'school affiliation':
+                mapping['school'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if col == 'gender' or col == 'sex':
+                mapping['gender'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if col == 'cgpa' or col == 'gpa' or 'cgpa' in col:
+                mapping['cgpa'] = i
+                break
+        
+        for i, col in enumerate(header_lower):
+            if 'team' in col:
+                mapping['team'] = i
+        
+        if 'team' not in mapping:
+            mapping['team'] = len(header) - 1
+        
+        return mapping
+    
+    def calculate_tutorial_thresholds(self, tutorial_students, team_size):
+        male_count = sum(1 for s in tutorial_students if s['gender'].upper() in ['M', 'MALE'])
+        return self.thresholds_from_counts(male_count, len(tutorial_students), team_size)
+    
+    def thresholds_from_counts(self, male_count, total, team_size):
+        female_count = total - male_count
+        
+        if total == 0:
+            return {'male_max': 3, 'female_max': 3, 'male_ratio': 0.5, 'female_ratio': 0.5}
+        
+        male_ratio = male_count / total
+        female_ratio = female_count / total
+        
+        # Adjust tolerance based on strictness
+        strictness = self.strictness
+        if strictness == "NIGHTMARE":
+            tolerance = 0.10  # Only 10% deviation
+        elif strictness == "ULTRA":
+            tolerance = 0.15  # 15% deviation
+        elif strictness == "STRICT":
+            tolerance = 0.20  # 20% deviation
+        else:
+            tolerance = 0.25  # 25% deviation
+        
+        male_max_ratio = min(male_ratio + tolerance, 1.0)
+        female_max_ratio = min(female_ratio + tolerance, 1.0)
+        
+        male_max = int(team_size * male_max_ratio + 0.5)
+        female_max = int(team_size * female_max_ratio + 0.5)
+        
+        min_minority = 1 if min(male_count, female_count) >= 1 else 0
+        
+        return {
+            'male_max': max(male_max, min_minority),
+            'female_max': max(female_max, min_minority),
+            'male_ratio': male_ratio,
+            'female_ratio': female_ratio,
+            'tolerance': tolerance
+        }
+    
+    def _track_stem_order(self, index, student):
+        # Running version of the STEM sorting check, so rows needn't be kept for it
+        school = student['school'].strip()
+        is_stem = school in STEM_SCHOOLS
+        order = self.stem_order
+        if not is_stem and order['first_non_stem'] is None:
+            order['first_non_stem'] = index
+        if order['first_non_stem'] is not None and is_stem:
+            order['count'] += 1
+            if len(order['violations']) < STEM_VIOLATION_SAMPLE:
+                order['violations'].append({
+                    'index': index,
+                    'student_id': student['id'],
+                    'school': school,
+                    'issue': f"STEM school '{school}' found at row {index+2} after non-STEM school at row {order['first_non_stem']+2}"
+                })
+
+    def check_stem_sorting(self):
+        """Check if the CSV data is sorted by STEM school status.
+
+        Returns (is_sorted, number of violations, the first few violations).
+        """
+        order = self.stem_order
+        return order['count'] == 0, order['count'], order['violations']
+
+    def validate_csv(self, filename, expected_team_size, keep_rows=True):
+        """Validate an allocation CSV in one streaming pass over its rows
+
+        Per-team counts and CGPA sums are accumulated as rows arrive, so apart from the
+        set of seen IDs memory grows with the number of teams, not rows. keep_rows=False skips building
+        students_data and all_teams (the member lists the GUI inspector needs).
+        """
+        self.stem_order = {'first_non_stem': None, 'count': 0, 'violations': []}
+        self.students_data = []
+        self.all_teams = {}
+        
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                raise Exception("CSV file is empty or has no data rows!")
+            col_map = self.detect_column_mapping(header)
+            
+            required = ['tutorial', 'id', 'school', 'gender', 'cgpa', 'team']
+            missing = [field for field in required if field not in col_map]
+            if missing:
+                raise Exception(f"Could not detect required columns: {', '.join(missing)}")
+            last_col = max(col_map.values())
+            
+            # STRICT CHECK 1: Duplicate Student IDs
+            # Parse, duplicate detection and per-team aggregation all happen in
+            # this one pass, with sets and dicts for the lookups
+            seen_ids = set()
+            duplicate_ids = set()
+            student_count = 0
+            tutorial_counts = {}  # tutorial -> [students, males]
+            tutorials = {}        # tutorial -> {team: aggregate}
+            tutorial_hashes = {}  # tutorial -> sha256 of its rows, only when caching
+            
+            for i, parts in enumerate(reader, 1):
+                if not parts or not ''.join(parts).strip():
+                    continue
+                if len(parts) <= last_col:
+                    continue
+                
+                try:
+                    student_id = parts[col_map['id']].strip()
+                    
+                    # Check for duplicates
+                    if student_id in seen_ids:
+                        duplicate_ids.add(student_id)
+                        self.add_issue('CRITICAL', 'Data Integrity', "Duplicate Student ID: {}", student_id)
+                    seen_ids.add(student_id)
+                    
+                    student = {
+                        'tutorial': parts[col_map['tutorial']].strip(),
+                        'id': student_id,
+                        'name': parts[col_map['name']].strip() if 'name' in col_map else 'N/A',
+                        'school': parts[col_map['school']].strip(),
+                        'gender': parts[col_map['gender']].strip(),
+                        'cgpa': parts[col_map['cgpa']].strip(),
+                        'team': parts[col_map['team']].strip()
+                    }
+                    
+                    # STRICT CHECK 2: Data format validation
+                    cgpa_val = None
+                    try:
+                        cgpa_val = float(student['cgpa'])
+                        if cgpa_val < 0 or cgpa_val > 5:
+                            self.add_issue('CRITICAL', 'Data Integrity', "Invalid CGPA {} for student {}", cgpa_val, student_id)
+                    except:
+                        cgpa_val = None
+                        self.add_issue('CRITICAL', 'Data Integrity', "Non-numeric CGPA for student {}", student_id)
+                    
+                    if not student['gender'].upper() in ['M', 'MALE', 'F', 'FEMALE']:
+                        self.add_issue('WARNING', 'Data Integrity', "Invalid gender '{}' for student {}", student['gender'], student_id)
+                    
+                    self._track_stem_order(student_count, student)
+                    student_count += 1
+                    
+                    tut, team = student['tutorial'], student['team']
+                    if self.cache is not None:
+                        if tut not in tutorial_hashes:
+                            tutorial_hashes[tut] = hashlib.sha256()
+                        tutorial_hashes[tut].update('\x1f'.join(student.values()).encode('utf-8') + b'\n')
+                    is_male = student['gender'].upper() in ['M', 'MALE']
+                    if tut not in tutorials:
+                        tutorial_counts[tut] = [0, 0]
+                        tutorials[tut] = {}
+                    tutorial_counts[tut][0] += 1
+                    tutorial_counts[tut][1] += is_male
+                    
+                    agg = tutorials[tut].get(team)
+                    if agg is None:
+                        agg = tutorials[tut][team] = {'size': 0, 'males': 0, 'schools': {},
+                                                      'cgpa_n': 0, 'cgpa_sum': 0.0, 'cgpa_run': 0.0, 'cgpa_m2': 0.0,
+                                                      'cgpa_min': None, 'cgpa_max': None}
+                    agg['size'] += 1
+                    agg['males'] += is_male
+                    agg['schools'][student['school']] = agg['schools'].get(student['school'], 0) + 1
+                    if cgpa_val is not None:
+                        # Welford's update; it tracks the two-pass std far closer than
+                        # a sum of squares, which matters at the 0.5/0.6/0.7 cut-offs
+                        agg['cgpa_n'] += 1
+                        agg['cgpa_sum'] += cgpa_val
+                        delta = cgpa_val - agg['cgpa_run']
+                        agg['cgpa_run'] += delta / agg['cgpa_n']
+                        agg['cgpa_m2'] += delta * (cgpa_val - agg['cgpa_run'])
+                        if agg['cgpa_min'] is None or cgpa_val < agg['cgpa_min']:
+                            agg['cgpa_min'] = cgpa_val
+                        if agg['cgpa_max'] is None or cgpa_val > agg['cgpa_max']:
+                            agg['cgpa_max'] = cgpa_val
+                    
+                    if keep_rows:
+                        self.students_data.append(student)
+                        self.all_teams.setdefault((tut, team), []).append(student)
+                except Exception as e:
+                    self.add_issue('WARNING', 'Data Integrity', "Malformed row at line {}: {}", i+1, str(e))
+                    continue
+        
+        if student_count == 0:
+            raise Exception("No valid student records found in CSV!")
+        
+        self.student_count = student_count
+        self.team_stats = tutorials
+        tutorial_hashes = {tut: h.hexdigest() for tut, h in tutorial_hashes.items()}
+        
+        # Calculate adaptive thresholds
+        self.tutorial_demographics = {}
+        for tut, (total, males) in tutorial_counts.items():
+            self.tutorial_demographics[tut] = self.thresholds_from_counts(males, total, expected_team_size)
+        
+        # STRICT CHECK 3: Team numbering consistency
+        all_team_nums = set()
+        for tut in tutorials:
+            for team_num in tutorials[tut]:
+                try:
+                    num = int(team_num)
+                    all_team_nums.add(num)
+                except:
+                    self.add_issue('WARNING', 'Data Quality', "Non-numeric team number '{}' in tutorial {}", team_num, tut)
+        
+        if all_team_nums:
+            expected_teams = set(range(1, max(all_team_nums) + 1))
+            missing_teams = expected_teams - all_team_nums
+            if missing_teams:
+                self.add_issue('WARNING', 'Data Quality', "Missing team numbers: {}", sorted(list(missing_teams))[:10])
+        
+        # Team CGPA mean/std from the running aggregates
+        strictness = self.strictness
+        for teams in tutorials.values():
+            for agg in teams.values():
+                n = agg['cgpa_n']
+                if n > 1:
+                    agg['mean'] = agg['cgpa_sum'] / n
+                    agg['std'] = math.sqrt(max(agg['cgpa_m2'] / n, 0.0))
+        
+        # Tutorials whose rows hash the same as on the last run of this file reuse
+        # their cached checks; only the rest are analysed (and outlier-scanned) again
+        cache_key, cached = self._load_cached_tutorials(filename, header, expected_team_size)
+        stale = [tut for tut in tutorials
+                 if tut not in cached or cached[tut]['hash'] != tutorial_hashes.get(tut)]
+        self.reused_tutorials = len(tutorials) - len(stale)
+        
+        # STRICT CHECK 8 needs each member's CGPA against its team's mean/std. Teams
+        # whose CGPA range stays within 2 std can't have an outlier; if any team can,
+        # re-read the file once and collect just those rows.
+        outliers = {}
+        if strictness in ["ULTRA", "NIGHTMARE"]:
+            suspects = set()
+            for tut in stale:
+                for team_num, agg in tutorials[tut].items():
+                    if agg['cgpa_n'] > 1 and agg['std'] > 0 and \
+                       max(agg['mean'] - agg['cgpa_min'], agg['cgpa_max'] - agg['mean']) > 2 * agg['std']:
+                        suspects.add((tut, team_num))
+            if suspects:
+                outliers = self._find_cgpa_outliers(filename, col_map, tutorials, suspects)
+        
+        partials = {tut: cached[tut]['partial'] for tut in tutorials if tut in cached}
+        for tut in stale:
+            partials[tut] = self._check_tutorial(tut, tutorials[tut], tutorial_counts[tut][0],
+                                                 expected_team_size, outliers)
+        if cache_key is not None and stale:
+            self.cache.put(cache_key, {tut: {'hash': tutorial_hashes[tut], 'partial': partials[tut]}
+                                       for tut in tutorials})
+            self.cache.evict()
+        
+        # Main Analysis: merge the per-tutorial results in file order
+        total_teams = sum(len(teams) for teams in tutorials.values())
+        gender_balanced, gender_imbalanced = 0, []
+        school_balanced, school_imbalanced = 0, []
+        all_team_means, all_team_stds, cgpa_high_variance = [], [], []
+        team_sizes = []
+        size_violations = []
+        empty_teams = []
+        
+        for tut_name in tutorials:
+            partial = partials[tut_name]
+            for severity, category, template, args in partial['issues']:
+                self.add_issue(severity, category, template, *args)
+            team_sizes.extend(partial['team_sizes'])
+            size_violations.extend(partial['size_violations'])
+            empty_teams.extend(partial['empty_teams'])
+            gender_balanced += partial['gender_balanced']
+            gender_imbalanced.extend(partial['gender_imbalanced'])
+            school_balanced += partial['school_balanced']
+            school_imbalanced.extend(partial['school_imbalanced'])
+            all_team_means.extend(partial['all_team_means'])
+            all_team_stds.extend(partial['all_team_stds'])
+            cgpa_high_variance.extend(partial['cgpa_high_variance'])
+        
+        # STRICT CHECK 9: Tutorial size consistency
+        tutorial_sizes = {}
+        for tut, (total, _) in tutorial_counts.items():
+            tutorial_sizes[tut] = total
+        
+        if len(set(tutorial_sizes.values())) > 3:  # More than 3 different sizes
+            self.add_issue('WARNING', 'Data Quality', "High variation in tutorial sizes: {}", dict(list(tutorial_sizes.items())[:5]))
+        
+        # STRICT CHECK 10: Teams per tutorial consistency
+        for tut in tutorials:
+            if partials[tut]['team_count_issue']:
+                self.add_issue('WARNING', 'Team Formation', "Tutorial {}: Expected {} teams, got {}",
+                               *partials[tut]['team_count_issue'])
+        
+        
+        # STRICT CHECK 11: STEM Sorting Order
+        stem_sorted, stem_violation_count, stem_violations = self.check_stem_sorting()
+        if not stem_sorted:
+            self.add_issue('WARNING', 'Data Quality', 
+                          "CSV not sorted by STEM status: {} violation(s)", stem_violation_count)
+            for violation in stem_violations[:5]:  # Show first 5 violations
+                self.add_issue('INFO', 'Data Quality', 
+                              "Row {}: {} (STEM) appears after non-STEM schools", violation['index']+2, violation['school'])
+
+        # Calculate scores with penalties
+        gender_balance_rate = (gender_balanced / total_teams) * 100
+        school_balance_rate = (school_balanced / total_teams) * 100
+        high_var = sum(1 for std in all_team_stds if std >= 0.5)
+        cgpa_score = 100 - (high_var / total_teams * 100) if all_team_stds else 100
+        
+        # Apply penalties based on critical issues
+        critical_count = self.all_issues.count('CRITICAL')
+        penalty = min(critical_count * 2, 20)  # Max 20% penalty
+        
+        overall_score = (gender_balance_rate * 0.4 + school_balance_rate * 0.4 + cgpa_score * 0.2) - penalty
+        overall_score = max(0, overall_score)  # Floor at 0
+        
+        if overall_score >= 95:
+            grade = "A+ (Excellent)"
+        elif overall_score >= 90:
+            grade = "A  (Very Good)"
+        elif overall_score >= 85:
+            grade = "B+ (Good)"
+        elif overall_score >= 80:
+            grade = "B  (Acceptable)"
+        elif overall_score >= 75:
+            grade = "C+ (Needs Improvement)"
+        elif overall_score >= 70:
+            grade = "C  (Poor)"
+        else:
+            grade = "F  (Failed)"
+        
+        summary = self.build_summary(student_count, total_teams, expected_team_size, team_sizes,
+                                     gender_balanced, len(gender_imbalanced), gender_balance_rate,
+                                     school_balanced, len(school_imbalanced), school_balance_rate,
+                                     all_team_means, all_team_stds, overall_score, grade, col_map, penalty)
+        
+        gender = self.build_gender_report_adaptive(gender_imbalanced)
+        school = self.build_school_report(school_imbalanced)
+        cgpa = self.build_cgpa_report(cgpa_high_variance, all_team_means, all_team_stds, total_teams)
+        quality = self.build_quality_report(student_count, total_teams, duplicate_ids, size_violations, empty_teams)
+        
+        # Raw figures behind the summary, for the run index
+        metrics = {
+            'expected_size': expected_team_size,
+            'gender_balanced': gender_balanced, 'gender_imbalanced': len(gender_imbalanced),
+            'school_balanced': school_balanced, 'school_imbalanced': len(school_imbalanced),
+            'gender_rate': gender_balance_rate, 'school_rate': school_balance_rate,
+            'cgpa_rate': 100 - (high_var / len(all_team_stds) * 100) if all_team_stds else 100,
+            'penalty': penalty,
+            'avg_team_mean': sum(all_team_means) / len(all_team_means) if all_team_means else None,
+            'avg_team_std': sum(all_team_stds) / len(all_team_stds) if all_team_stds else None,
+        }
+        
+        # The full issue listing is left to build_critical_report(), so messages are
+        # only formatted when someone shows or logs them
+        return {
+            'summary': summary, 'gender': gender, 'school': school, 'cgpa': cgpa,
+            'quality': quality,
+            'score': overall_score, 'grade': grade, 'metrics': metrics
+        }
+    
+    def _load_cached_tutorials(self, filename, header, expected_team_size):
+        """Cache key for this file and settings, and its cached {tutorial: {'hash', 'partial'}}"""
+        if self.cache is None:
+            return None, {}
+        payload = json.dumps([CHECKS_VERSION, os.path.abspath(filename), header,
+                              self.strictness, expected_team_size])
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return key, self.cache.get(key) or {}
+    
+    def _check_tutorial(self, tut_name, teams, total, expected_team_size, outliers):
+        """Checks 4-8 and 10 for one tutorial's teams
+
+        Issues and per-team stats are returned instead of recorded, as plain lists so the
+        result can be cached as JSON and merged back in tutorial order.
+        """
+        thresholds = self.tutorial_demographics[tut_name]
+        issues = []
+        partial = {'issues': issues, 'team_sizes': [], 'size_violations': [], 'empty_teams': [],
+                   'gender_balanced': 0, 'gender_imbalanced': [], 'school_balanced': 0, 'school_imbalanced': [],
+                   'all_team_means': [], 'all_team_stds': [], 'cgpa_high_variance': [], 'team_count_issue': None}
+        
+        for team_num, agg in teams.items():
+            size = agg['size']
+            partial['team_sizes'].append(size)
+            
+            # STRICT CHECK 4: Team size violations
+            if size == 0:
+                partial['empty_teams'].append((tut_name, team_num))
+                issues.append(('CRITICAL', 'Team Formation', "Empty team: Tutorial {}, Team {}", (tut_name, team_num)))
+            
+            if size != expected_team_size:
+                partial['size_violations'].append((tut_name, team_num, size, expected_team_size))
+                if self.strictness in ["ULTRA", "NIGHTMARE"]:
+                    if abs(size - expected_team_size) > 1:
+                        issues.append(('CRITICAL', 'Team Formation', "Team size {} deviates significantly from expected {} (Tutorial {}, Team {})",
+                                       (size, expected_team_size, tut_name, team_num)))
+                    else:
+                        issues.append(('WARNING', 'Team Formation', "Team size {} differs from expected {} (Tutorial {}, Team {})",
+                                       (size, expected_team_size, tut_name, team_num)))
+            
+            # Gender check
+            males = agg['males']
+            females = size - males
+            
+            if males <= thresholds['male_max'] and females <= thresholds['female_max']:
+                partial['gender_balanced'] += 1
+            else:
+                partial['gender_imbalanced'].append((tut_name, team_num, males, females, size, thresholds['male_max'], thresholds['female_max']))
+                issues.append(('WARNING', 'Gender Balance', "Tutorial {}, Team {}: M={}, F={} (max: {}M/{}F)",
+                               (tut_name, team_num, males, females, thresholds['male_max'], thresholds['female_max'])))
+            
+            # STRICT CHECK 5: Single gender teams (nightmare mode)
+            if self.strictness == "NIGHTMARE":
+                if males == 0 or females == 0:
+                    issues.append(('CRITICAL', 'Gender Balance', "Single-gender team detected: Tutorial {}, Team {} (M={}, F={})",
+                                   (tut_name, team_num, males, females)))
+            
+            # School check
+            max_school = (size // 2) + 1
+            school_count = agg['schools']
+            
+            school_ok = True
+            for school, count in school_count.items():
+                if count > max_school:
+                    partial['school_imbalanced'].append((tut_name, team_num, school, count, size, max_school))
+                    school_ok = False
+                    issues.append(('WARNING', 'School Diversity', "Tutorial {}, Team {}: {} has {}/{} members (max: {})",
+                                   (tut_name, team_num, school, count, size, max_school)))
+            
+            if school_ok:
+                partial['school_balanced'] += 1
+            
+            # STRICT CHECK 6: Single school teams
+            if len(school_count) == 1 and size > 1:
+                issues.append(('CRITICAL', 'School Diversity', "All members from same school: Tutorial {}, Team {} ({})",
+                               (tut_name, team_num, list(school_count.keys())[0])))
+            
+            # CGPA check
+            if agg['cgpa_n'] > 1:
+                mean, std = agg['mean'], agg['std']
+                partial['all_team_means'].append(mean)
+                partial['all_team_stds'].append(std)
+                
+                # STRICT CHECK 7: Extreme CGPA variance
+                if self.strictness == "NIGHTMARE" and std >= 0.6:
+                    partial['cgpa_high_variance'].append((tut_name, team_num, mean, std))
+                    issues.append(('WARNING', 'CGPA Distribution', "Very high CGPA variance: Tutorial {}, Team {} (std={:.3f})",
+                                   (tut_name, team_num, std)))
+                elif std >= 0.7:
+                    partial['cgpa_high_variance'].append((tut_name, team_num, mean, std))
+                    issues.append(('WARNING', 'CGPA Distribution', "Extreme CGPA variance: Tutorial {}, Team {} (std={:.3f})",
+                                   (tut_name, team_num, std)))
+                
+                # STRICT CHECK 8: CGPA outliers within team
+                for name, cgpa in outliers.get((tut_name, team_num), []):
+                    issues.append(('INFO', 'CGPA Distribution', "Potential outlier: {} (CGPA {:.2f}) in Tutorial {}, Team {} (mean={:.2f}, std={:.2f})",
+                                   (name, cgpa, tut_name, team_num, mean, std)))
+        
+        # STRICT CHECK 10: Teams per tutorial consistency
+        expected_teams = (total + expected_team_size - 1) // expected_team_size
+        if len(teams) != expected_teams:
+            partial['team_count_issue'] = (tut_name, expected_teams, len(teams))
+        return partial
+    
+    def _find_cgpa_outliers(self, filename, col_map, tutorials, suspects):
+        """Second pass over the file: (name, CGPA) of members more than 2 std from their team mean"""
+        outliers = {}
+        last_col = max(col_map.values())
+        with open(filename, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for parts in reader:
+                if len(parts) <= last_col:
+                    continue
+                key = (parts[col_map['tutorial']].strip(), parts[col_map['team']].strip())
+                if key not in suspects:
+                    continue
+                try:
+                    cgpa = float(parts[col_map['cgpa']].strip())
+                except ValueError:
+                    continue
+                agg = tutorials[key[0]][key[1]]
+                if abs(cgpa - agg['mean']) > 2 * agg['std']:
+                    name = parts[col_map['name']].strip() if 'name' in col_map else 'N/A'
+                    outliers.setdefault(key, []).append((name, cgpa))
+        return outliers
+    
+    def build_critical_report(self):
+        """Build comprehensive report showing ALL issues by severity."""
+        store = self.all_issues
+        if not store:
+            return "✅ No issues detected! Perfect allocation.\n\nYour algorithm is flawless."
+        
+        lines = ["="*70, f"ALL ISSUES FOUND ({len(store)} total)", "="*70, ""]
+        
+        # CRITICAL > WARNING > INFO, bucketed in one pass instead of sorted
+        icons = {'CRITICAL': '🚨', 'WARNING': '⚠️', 'INFO': 'ℹ️'}
+        for sev, indices in zip(SEVERITIES, store.by_severity()):
+            if not indices:
+                continue
+            # Header per severity
+            lines.append(f"{icons.get(sev, '')} {sev} ISSUES ({len(indices)}):")
+            lines.append("-"*70)
+            for idx, i in enumerate(indices, 1):
+                lines.append(f"{idx:3d}. [{store.category(i)}] {store.message(i)}")
+            lines.append("")
+        
+        return "\n".join(lines) + "\n"
+    
+    def build_quality_report(self, total_students, total_teams, duplicates, size_violations, empty_teams):
+        """Build data quality report."""
+        s = "="*70 + "\n"
+        s += "DATA QUALITY ANALYSIS\n"
+        s += "="*70 + "\n\n"
+        
+        s += f"Total Records: {total_students}\n"
+        s += f"Total Teams: {total_teams}\n\n"
+        
+        s += "QUALITY CHECKS:\n"
+        s += "-"*70 + "\n"
+        
+        s += f"✓ Duplicate Student IDs: {len(duplicates)}\n"
+        if duplicates:
+            s += f"  IDs: {list(duplicates)[:10]}\n"
+        
+        s += f"✓ Team Size Violations: {len(size_violations)}\n"
+        if size_violations and len(size_violations) <= 20:
+            for tut, team, size, expected in size_violations[:20]:
+                s += f"  - Tutorial {tut}, Team {team}: size {size} (expected {expected})\n"
+        
+        s += f"✓ Empty Teams: {len(empty_teams)}\n"
+        if empty_teams:
+            for tut, team in empty_teams:
+                s += f"  - Tutorial {tut}, Team {team}\n"
+        
+        
+        # Check STEM sorting
+        stem_sorted, stem_violation_count, stem_violations = self.check_stem_sorting()
+        s += f"✓ STEM Sorting: {'CORRECT' if stem_sorted else 'INCORRECT'}\n"
+        if not stem_sorted:
+            s += f"   {stem_violation_count} sorting violation(s) detected\n"
+            for violation in stem_violations[:10]:  # Show up to 10 violations
+                s += f"   - {violation['issue']}\n"
+
+        return s
+    
+    def build_summary(self, total_students, total_teams, expected_size, team_sizes, 
+                     gender_bal, gender_imbal, gender_rate,
+                     school_bal, school_imbal, school_rate,
+                     means, stds, score, grade, col_map, penalty):
+        s = "="*70 + "\n"
+        s += f"TEAM ALLOCATION VALIDATION SUMMARY ({self.strictness} MODE)\n"
+        s += "="*70 + "\n\n"
+        
+        s += f"✓ Strictness Level: {self.strictness}\n"
+        s += f"✓ Total Issues Found: {len(self.all_issues)}\n"
+        if penalty > 0:
+            s += f"⚠️  Score Penalty: -{penalty:.1f}%\n"
+        s += "\n"
+        
+        s += f"Total Students: {total_students}\n"
+        s += f"Total Teams:    {total_teams}\n"
+        s += f"Expected Size:  {expected_size}\n\n"
+        
+        size_counts = {}
+        for size in team_sizes:
+            size_counts[size] = size_counts.get(size, 0) + 1
+        
+        s += "TEAM SIZE DISTRIBUTION:\n"
+        s += "-"*70 + "\n"
+        for size in sorted(size_counts.keys()):
+            count = size_counts[size]
+            perc = (count / total_teams) * 100
+            status = "✓" if size == expected_size else "⚠"
+            s += f"{status} Size {size}: {count:4d} teams ({perc:5.1f}%)\n"
+        
+        s += "\n" + "="*70 + "\n"
+        s += "BALANCE SUMMARY\n"
+        s += "="*70 + "\n\n"
+        
+        s += f"GENDER BALANCE:\n"
+        s += f"  ✓ Balanced:   {gender_bal:4d} teams ({gender_rate:5.1f}%)\n"
+        s += f"  ✗ Imbalanced: {gender_imbal:4d} teams ({100-gender_rate:5.1f}%)\n\n"
+        
+        s += f"SCHOOL DIVERSITY:\n"
+        s += f"  ✓ Balanced:   {school_bal:4d} teams ({school_rate:5.1f}%)\n"
+        s += f"  ✗ Imbalanced: {school_imbal:4d} teams ({100-school_rate:5.1f}%)\n\n"
+        
+        if means:
+            s += f"CGPA STATISTICS:\n"
+            s += f"  Average team mean: {sum(means)/len(means):.3f}\n"
+            s += f"  Average team std:  {sum(stds)/len(stds):.3f}\n"
+            s += f"  Range: {min(means):.3f} to {max(means):.3f}\n\n"
+        
+        s += "="*70 + "\n"
+        s += "OVERALL QUALITY SCORE\n"
+        s += "="*70 + "\n\n"
+        s += f"Gender Balance:     {gender_rate:5.1f}%\n"
+        s += f"School Diversity:   {school_rate:5.1f}%\n"
+        if stds:
+            cgpa_dist = 100 - (sum(1 for std in stds if std >= 0.5) / len(stds) * 100)
+        else:
+            cgpa_dist = 100
+        s += f"CGPA Distribution:  {cgpa_dist:5.1f}%\n"
+        if penalty > 0:
+            s += f"Penalty:            -{penalty:.1f}%\n"
+        s += "-"*70 + "\n"
+        s += f"FINAL SCORE:        {score:5.1f}%\n"
+        s += f"GRADE:              {grade}\n"
+        
+        return s
+    
+    def build_gender_report_adaptive(self, imbalanced):
+        if not imbalanced:
+            return "✅ Perfect gender balance!\nAll teams respect tutorial demographics."
+        
+        s = f"GENDER-IMBALANCED TEAMS ({len(imbalanced)} total)\n"
+        s += "="*70 + "\n\n"
+        for i, (tut, team, m, f, size, max_m, max_f) in enumerate(imbalanced, 1):
+            s += f"{i:3d}. Tutorial {tut:6s}, Team {team:4s}: M={m}, F={f} "
+            s += f"(size={size}, max: {max_m}M/{max_f}F)\n"
+        return s
+    
+    def build_school_report(self, imbalanced):
+        if not imbalanced:
+            return "✅ Perfect school diversity!\nAll teams have proper school balance."
+        
+        s = f"SCHOOL-IMBALANCED TEAMS ({len(imbalanced)} total)\n"
+        s += "="*70 + "\n\n"
+        for i, (tut, team, school, count, size, max_allow) in enumerate(imbalanced, 1):
+            s += f"{i:3d}. Tutorial {tut:6s}, Team {team:4s}: {school:15s} "
+            s += f"has {count}/{size} members (max: {max_allow})\n"
+        return s
+    
+    def build_cgpa_report(self, high_var, means, stds, total_teams):
+        s = "CGPA VARIANCE ANALYSIS\n"
+        s += "="*70 + "\n\n"
+        
+        if not stds:
+            return s + "No CGPA data available.\n"
+        
+        low_var = sum(1 for std in stds if std < 0.3)
+        med_var = sum(1 for std in stds if 0.3 <= std < 0.5)
+        high_v = sum(1 for std in stds if std >= 0.5)
+        
+        s += f"Low variance (< 0.3):      {low_var:4d} teams ({low_var/total_teams*100:5.1f}%)\n"
+        s += f"Medium variance (0.3-0.5): {med_var:4d} teams ({med_var/total_teams*100:5.1f}%)\n"
+        s += f"High variance (≥ 0.5):     {high_v:4d} teams ({high_v/total_teams*100:5.1f}%)\n\n"
+        
+        if high_var:
+            s += f"Teams with HIGH variance: {len(high_var)}\n"
+            s += "-"*70 + "\n"
+            for i, (tut, team, mean, std) in enumerate(high_var[:100], 1):
+                s += f"{i:3d}. Tutorial {tut:6s}, Team {team:4s}: Mean={mean:.2f}, Std={std:.2f}\n"
+        else:
+            s += "✅ All teams have acceptable CGPA variance!\n"
+        
+        return s
+
+
+def validate_to_json(filename, team_size, strictness, cache_dir=None):
+    """Validate one file and return a JSON-ready summary; errors are reported, not raised"""
+    result = {'file': filename, 'team_size': team_size, 'strictness': strictness}
+    cache = None
+    if cache_dir:
+        from allocation_cache import ResultCache
+        cache = ResultCache(cache_dir)
+    engine = ValidationEngine(strictness, cache)
+    try:
+        results = engine.validate_file(filename, team_size, keep_rows=False)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    result['score'] = round(results['score'], 2)
+    result['grade'] = results['grade']
+    result['students'] = engine.student_count
+    result['teams'] = sum(len(teams) for teams in engine.team_stats.values())
+    result['issues'] = engine.issue_counts()
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate team allocation CSV files without the GUI")
+    parser.add_argument('files', nargs='+', help="allocation CSV files")
+    parser.add_argument('--team-size', type=int, default=5)
+    parser.add_argument('--strictness', choices=STRICTNESS_LEVELS, default="ULTRA")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (files are validated in parallel)")
+    parser.add_argument('--cache-dir', help=f"reuse per-tutorial results of unchanged tutorials, e.g. {VALIDATION_CACHE_DIR}")
+    args = parser.parse_args(argv)
+    
+    if args.workers > 1 and len(args.files) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(validate_to_json, f, args.team_size, args.strictness, args.cache_dir) for f in args.files]
+            results = [future.result() for future in futures]
+    else:
+        results = [validate_to_json(f, args.team_size, args.strictness, args.cache_dir) for f in args.files]
+    
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    return 1 if any('error' in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())